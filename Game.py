@@ -4,19 +4,35 @@ from players_class.lag import Lag
 from players_class.maniac import Maniac
 from players_class.nit import Nit
 from players_class.best_choice import best_choice
-from stats import Stat
+from stats import Stat, LazyStats, allin_equities, EQUITY_MODES
 from deal import Deal
-from utils import hand_rank
+from utils import evaluate
+from events import NullSink, DEBUG, INFO
+from history import GameHistory, HistoryWriter
 import json
 
 class Game:
-    def __init__(self, big_blind=50, small_blind=25, stack=1000, num_simulations=2000):
+    def __init__(self, big_blind=50, small_blind=25, stack=1000, num_simulations=2000, equity_mode="auto", target_se=0.01,
+                 allin_ev=False, events=None):
         self.big_blind = big_blind
         self.small_blind = small_blind  
         self.initial_stack = stack
         self.num_simulations = num_simulations
+        if equity_mode not in EQUITY_MODES:
+            raise ValueError(f"Mode d'équité inconnu : {equity_mode!r} (attendu : {', '.join(EQUITY_MODES)})")
+        self.equity_mode = equity_mode
+        self.target_se = target_se
+        self.allin_ev = allin_ev  # Tapis : suivi du profit ajusté selon l'équité (réduction de variance)
+        self.events = events if events is not None else NullSink()  # Journal d'événements (aucune sortie console par défaut)
         self.game_count = 0
-        self.game_history = []
+
+        # Mémo d'équité de la main en cours : (joueur, street, nb d'adversaires)
+        # -> (équité, simulations, exacte, précision) ; précision = simulations derrière l'équité (None = exacte)
+        self._equity_memo = {}
+        self.simulations_run = 0
+        self.simulations_saved = 0
+        self.exact_run = 0  # Énumérations exactes effectuées (comptées à part des simulations Monte Carlo)
+        self.exact_saved = 0  # Énumérations exactes évitées par le mémo
 
         self.values = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
 
@@ -36,6 +52,9 @@ class Game:
 
         self.players = [self.calling_station, self.tag, self.lag, self.maniac, self.nit, self.best_choice]
         self.player_names = ['calling_station', 'tag', 'lag', 'maniac', 'nit', 'best_choice']
+        self.game_history = GameHistory(self.player_names)  # Historique columnaire (voir history.py)
+        self._history_writer = None  # HistoryWriter actif pendant simulation(stream_path=...)
+        self.allin_adjustments = {name: 0.0 for name in self.player_names}  # Jetons espérés - jetons gagnés sur les tapis
 
     def game(self):
         """
@@ -53,11 +72,13 @@ class Game:
         """
         dealer = Deal()
         dealer.cards_init()
+        self._equity_memo.clear()
         
         active_players = [p for p in self.players if p.stack > 0]
         if len(active_players) < 2:
             return None
 
+        # Cartes au format entier (0-51) dans tout le moteur, converties en tuples uniquement pour l'historique
         for player in active_players:
             player.hand = dealer.deal_player_hand()
         
@@ -82,23 +103,32 @@ class Game:
         pot, active_players, current_bets = self._betting_round(active_players, pot, current_bets, board, 0)
         if len(active_players) == 1:
             return self._award_pot(active_players[0], pot, board)
+        if self._all_in(active_players):
+            return self._resolve_all_in(dealer, active_players, pot, board)
         
         # FLOP
         board = dealer.deal_board()
+        self._equity_memo.clear()  # nouveau board : les équités de la street précédente ne sont plus valables
         current_bets = {id(p): 0 for p in active_players}
         pot, active_players, current_bets = self._betting_round(active_players, pot, current_bets, board, 1)
         if len(active_players) == 1:
             return self._award_pot(active_players[0], pot, board)
+        if self._all_in(active_players):
+            return self._resolve_all_in(dealer, active_players, pot, board)
         
         # TURN
         board = dealer.deal_board()
+        self._equity_memo.clear()  # nouveau board : les équités de la street précédente ne sont plus valables
         current_bets = {id(p): 0 for p in active_players}
         pot, active_players, current_bets = self._betting_round(active_players, pot, current_bets, board, 2)
         if len(active_players) == 1:
             return self._award_pot(active_players[0], pot, board)
+        if self._all_in(active_players):
+            return self._resolve_all_in(dealer, active_players, pot, board)
         
         # RIVER
         board = dealer.deal_board()
+        self._equity_memo.clear()  # nouveau board : les équités de la street précédente ne sont plus valables
         current_bets = {id(p): 0 for p in active_players}
         pot, active_players, current_bets = self._betting_round(active_players, pot, current_bets, board, 3)
         if len(active_players) == 1:
@@ -118,6 +148,11 @@ class Game:
             someone_acted = False
             current_bet = max(current_bets.values()) if current_bets else 0
 
+            # Plus personne ne peut miser (tapis) : aucune action ni calcul d'équité à demander
+            can_act = [p for p in active_players if p.stack > 0]
+            if not can_act or (len(can_act) == 1 and current_bets[id(can_act[0])] >= current_bet):
+                break
+
             for player in active_players[:]:
                 if player.stack == 0:
                     continue
@@ -125,17 +160,27 @@ class Game:
                 # Montant que le joueur doit ajouter pour égaliser
                 amount_to_call = current_bet - current_bets[id(player)]
                 
-                # Obtenir les statistiques
-                equity, optimal_bet, optimal_choice = self.get_stats(
-                    player_hand=player.hand,
-                    board=board,
-                    pot=pot,
-                    amount_to_call=amount_to_call
-                )
+                # Statistiques paresseuses : calculées seulement si la stratégie du joueur les lit
+                def compute_stats(player=player, amount_to_call=amount_to_call, pot=pot,
+                                  num_opponents=len(active_players) - 1):
+                    equity, optimal_bet, optimal_choice = self.get_stats(
+                        player_hand=player.hand,
+                        board=board,
+                        pot=pot,
+                        amount_to_call=amount_to_call,
+                        num_opponents=num_opponents,
+                        memo_key=(id(player), state, num_opponents)
+                    )
+                    return equity, optimal_choice, optimal_bet
+
+                stats = LazyStats(compute_stats)
                 
                 # Obtenir l'action du joueur
-                action = self._get_player_action(player, amount_to_call, optimal_choice, optimal_bet, equity)
-                print(action)
+                action = self._get_player_action(player, amount_to_call, stats)
+                if self.events.enabled(DEBUG):
+                    self.events.emit(DEBUG, "action", {'game_number': self.game_count, 'street': state,
+                                                       'player': self.player_names[self.players.index(player)],
+                                                       'amount_to_call': amount_to_call, 'action': action})
 
                 # Traiter l'action
                 if 'fold' in action:
@@ -191,6 +236,31 @@ class Game:
         
         return pot, active_players, current_bets
 
+    def _all_in(self, active_players):
+        """
+        Vrai si au plus un joueur encore en jeu a des jetons : il n'y a plus de décision à prendre.
+        """
+        return sum(1 for p in active_players if p.stack > 0) <= 1
+
+    def _resolve_all_in(self, dealer, active_players, pot, board):
+        """
+        Tapis : le board restant est distribué d'un coup, sans tour d'enchères ni calcul d'équité par joueur.
+        Avec allin_ev, l'équité de chaque main sur le board actuel (énumération des runouts) est aussi calculée :
+        l'écart entre les jetons espérés et ceux réellement gagnés est cumulé dans allin_adjustments,
+        ce qui donne un profit ajusté de la chance des tapis (réduction de variance) sans changer le déroulement.
+        """
+        if not self.allin_ev:
+            return self._showdown(active_players, pot, dealer.deal_runout())
+
+        shares = allin_equities([p.hand for p in active_players], board)
+        stacks_before = [p.stack for p in active_players]
+        game_data = self._showdown(active_players, pot, dealer.deal_runout())
+
+        for player, share, stack_before in zip(active_players, shares, stacks_before):
+            name = self.player_names[self.players.index(player)]
+            self.allin_adjustments[name] += pot * float(share) - (player.stack - stack_before)
+        return game_data
+
     def _get_position_name(self, position):
         position_names = {
             0: "button",
@@ -202,34 +272,31 @@ class Game:
         }
         return position_names.get(position, position)
 
-    def _get_player_action(self, player, amount_to_call, optimal_choice, optimal_bet, equity):
+    def _get_player_action(self, player, amount_to_call, stats):
         """
         Récupère l'action d'un joueur
+
+        Args:
+            player: Joueur qui doit agir
+            amount_to_call: Montant à payer
+            stats: LazyStats (équité, choix optimal, montant optimal) évaluées à la demande
         """
+        position_name = self._get_position_name(player.position)
         try:
-            position_name = self._get_position_name(player.position)
-            result = player.action(amount_to_call, position_name, optimal_choice, optimal_bet, equity)
-            
-            if isinstance(result, str):
-                return {result: True}
-            return result
-        except Exception as e:
+            result = player.action(amount_to_call, position_name, stats=stats)
+        except Exception:
+            # Seules les erreurs de la stratégie valent un fold : une erreur du calcul des statistiques remonte
+            if stats.error is not None:
+                raise stats.error
             return {'fold': True}
 
+        if isinstance(result, str):
+            return {result: True}
+        return result
+
     def _award_pot(self, winner, pot, board):
         winner.stack += pot
-        winner_name = self.player_names[self.players.index(winner)]
-        
-        game_data = {
-            'game_number': self.game_count,
-            'winner': winner_name,
-            'pot': pot,
-            'board': board,
-            'final_stacks': {name: p.stack for name, p in zip(self.player_names, self.players)}
-        }
-        
-        self.game_history.append(game_data)
-        return game_data
+        return self._record_hand([winner], pot, board)
 
     def _showdown(self, active_players, pot, board):
         if board is None:
@@ -239,7 +306,7 @@ class Game:
         winners = []
         
         for player in active_players:
-            rank, _ = hand_rank(player.hand, board)
+            rank = evaluate(player.hand + board)
             if rank > best_rank:
                 best_rank = rank
                 winners = [player]
@@ -252,29 +319,51 @@ class Game:
         for i, winner in enumerate(winners):
             winner.stack += share + (remainder if i == 0 else 0)
         
-        winner_names = [self.player_names[self.players.index(w)] for w in winners]
-        
-        game_data = {
-            'game_number': self.game_count,
-            'winner': winner_names[0] if len(winners) == 1 else winner_names,
-            'pot': pot,
-            'board': board,
-            'final_stacks': {name: p.stack for name, p in zip(self.player_names, self.players)}
-        }
+        return self._record_hand(winners, pot, board)
+
+    def _record_hand(self, winners, pot, board):
+        """
+        Enregistre la main terminée dans l'historique columnaire
         
-        self.game_history.append(game_data)
+        Returns:
+            dict: La main au format d'origine (game_number, winner, pot, board, final_stacks)
+        """
+        self.game_history.append(self.game_count, pot, [self.players.index(w) for w in winners], board,
+                                 [p.stack for p in self.players])
+        game_data = self.game_history[-1]
+        if self._history_writer is not None:
+            self._history_writer.write(game_data)
+        if self.events.enabled(INFO):
+            self.events.emit(INFO, "hand", game_data)
         return game_data
     
-    def simulation(self, save_path: str = None):
+    def simulation(self, save_path: str = None, stream_path: str = None):
         """
         Génère une simulation jusqu'à ce qu'un seul joueur ait tous les jetons
         
         Args:
             save_path: Chemin pour sauvegarder les stats (optionnel)
+            stream_path: Fichier JSON Lines (.jsonl ou .jsonl.gz) où chaque main est écrite dès qu'elle
+                         est terminée, suivie d'une ligne de résumé (optionnel, voir history.HistoryWriter)
         
         Note: La simulation continue jusqu'à ce qu'un seul joueur reste.
         """
+        if stream_path:
+            self._history_writer = HistoryWriter(stream_path)
+        try:
+            return self._run_simulation(save_path)
+        finally:
+            if self._history_writer is not None:
+                self._history_writer.close()
+                self._history_writer = None
+
+    def _run_simulation(self, save_path):
         total_start = sum(p.stack for p in self.players)
+        self.simulations_run = 0
+        self.simulations_saved = 0
+        self.exact_run = 0
+        self.exact_saved = 0
+        self.allin_adjustments = {name: 0.0 for name in self.player_names}
         
         game_num = 0
         while True:
@@ -306,6 +395,8 @@ class Game:
         
         # Calculer les statistiques
         stats = self._calculate_stats()
+        if self._history_writer is not None:
+            self._history_writer.write({k: v for k, v in stats.items() if k != 'game_history'}, record_type="summary")
         
         # Sauvegarder
         if save_path:
@@ -319,20 +410,24 @@ class Game:
         """
         stats = {
             'total_games': len(self.game_history),
+            'simulations_run': self.simulations_run,
+            'simulations_saved': self.simulations_saved,
+            'exact_run': self.exact_run,
+            'exact_saved': self.exact_saved,
             'player_stats': {},
             'game_history': self.game_history
         }
         
-        for name, player in zip(self.player_names, self.players):
-            wins = sum(1 for g in self.game_history 
-                      if g.get('winner') == name or 
-                      (isinstance(g.get('winner'), list) and name in g.get('winner')))
-            
+        win_counts = self.game_history.win_counts()
+        for name, player, wins in zip(self.player_names, self.players, win_counts.tolist()):
             stats['player_stats'][name] = {
                 'final_stack': player.stack,
                 'profit': player.stack - self.initial_stack,
                 'wins': wins
             }
+            if self.allin_ev:
+                stats['player_stats'][name]['allin_adjusted_profit'] = round(
+                    player.stack - self.initial_stack + self.allin_adjustments[name], 2)
         
         return stats
 
@@ -341,9 +436,16 @@ class Game:
         Sauvegarde dans un fichier JSON
         """
         with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            json.dump(data, f, indent=2, ensure_ascii=False, default=self._json_default)
 
-    def get_stats(self, player_hand, board, pot, amount_to_call):
+    @staticmethod
+    def _json_default(obj):
+        # L'historique columnaire est exporté au format d'origine (liste de dicts)
+        if isinstance(obj, GameHistory):
+            return obj.to_dicts()
+        raise TypeError(f"Type non sérialisable : {type(obj).__name__}")
+
+    def get_stats(self, player_hand, board, pot, amount_to_call, num_opponents=1, memo_key=None):
         """
         Crée un objet Stat pour un joueur
         
@@ -352,6 +454,10 @@ class Game:
             board: Board actuel (peut être None ou vide)
             pot: Taille du pot
             amount_to_call: Montant à payer
+            num_opponents: Nombre d'adversaires encore en jeu
+            memo_key: Clé du mémo d'équité de la main en cours (joueur, street, nb d'adversaires).
+                      Si l'équité est déjà connue et assez précise pour les nouveaux pot et montant à payer
+                      (voir stats.estimate_suffices), seuls ceux-ci sont réévalués ; sinon elle est recalculée.
             
         Returns:
             Stat: Objet Stat initialisé
@@ -359,5 +465,18 @@ class Game:
         if board is None:
             board = []
 
-        stat = Stat(hand=player_hand, board=board, pot=pot, amount_to_call=amount_to_call)
-        return stat.win_chance_and_choice(num_simulations=self.num_simulations)
+        memo = self._equity_memo.get(memo_key) if memo_key is not None else None
+        stat = Stat(hand=player_hand, board=board, pot=pot, amount_to_call=amount_to_call,
+                    equity_mode=self.equity_mode, target_se=self.target_se, num_opponents=num_opponents,
+                    equity=memo[0] if memo else None, equity_trials=memo[3] if memo else None)
+        result = stat.win_chance_and_choice(num_simulations=self.num_simulations)
+
+        if memo and stat.equity_from_preset:
+            self.simulations_saved += memo[1]
+            self.exact_saved += memo[2]
+        else:
+            self.simulations_run += stat.trials_used
+            self.exact_run += stat.exact_used
+            if memo_key is not None:
+                self._equity_memo[memo_key] = (result[0], stat.trials_used, stat.exact_used, stat.equity_trials)
+        return result
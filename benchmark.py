@@ -0,0 +1,82 @@
+import time
+import random
+import numpy as np
+from functools import partial
+from utils import hand_rank, evaluate, evaluate_batch, ints_to_cards
+
+
+def random_hands(n_hands, seed=0):
+    """
+    Tire n_hands mains de 7 cartes distinctes (entiers 0-51), forme (n_hands, 7).
+    """
+    rng = np.random.default_rng(seed)
+    return np.argsort(rng.random((n_hands, 52)), axis=1)[:, :7]
+
+
+def benchmark_evaluators(n_hands=1_000_000, n_loop=50_000):
+    """
+    Compare le débit (mains/seconde) de hand_rank, evaluate et evaluate_batch.
+    arg: n_hands --> Nombre de mains pour evaluate_batch.
+    arg: n_loop --> Nombre de mains pour les évaluateurs appelés en boucle Python.
+    """
+    hands = random_hands(n_hands)
+    loop_hands = hands[:n_loop]
+    tuple_hands = [ints_to_cards(h) for h in loop_hands.tolist()]
+    int_hands = loop_hands.tolist()
+
+    results = {}
+
+    start = time.perf_counter()
+    for cards in tuple_hands:
+        hand_rank(cards[:2], cards[2:])
+    results['hand_rank'] = n_loop / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for cards in int_hands:
+        evaluate(cards)
+    results['evaluate'] = n_loop / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    strengths = evaluate_batch(hands)
+    results['evaluate_batch'] = n_hands / (time.perf_counter() - start)
+
+    # Vérification de cohérence sur un échantillon
+    sample = random.sample(range(n_loop), 1000)
+    assert all(strengths[i] == evaluate(int_hands[i]) for i in sample)
+
+    print(f"{'Évaluateur':<16} {'Mains/s':>14} {'Accélération':>14}")
+    for name, rate in results.items():
+        print(f"{name:<16} {rate:>14,.0f} {rate / results['hand_rank']:>13.1f}x")
+    return results
+
+
+def benchmark_shared_tables(processes=4, n_simulations=8, start_method="spawn"):
+    """
+    Compare la mémoire par processus d'un EnginePool sans puis avec partage des tables, sur les mêmes tournois.
+    arg: processes --> Nombre de processus du pool.
+    arg: n_simulations --> Nombre de tournois joués par chaque pool.
+    arg: start_method --> Méthode de démarrage ("spawn" : chaque processus réimporte les modules).
+    """
+    from engine_pool import EnginePool
+    from game_rendering import GraphicalRendering
+
+    run_chunk = partial(GraphicalRendering._run_simulation_chunk_static, initial_stack=1000, save_results=False,
+                        save_dir="", seed=0)
+    reports = {}
+    for share_tables in (False, True):
+        with EnginePool(processes, share_tables=share_tables, start_method=start_method) as pool:
+            for _ in pool.imap_unordered(run_chunk, ([sim_num] for sim_num in range(n_simulations))):
+                pass
+            reports[share_tables] = pool.memory_report()
+
+    print(f"Mémoire moyenne par processus (Mo, {processes} processus, {start_method})")
+    print(f"{'Tables':<12} {'RSS':>10} {'PSS':>10} {'Privée':>10}")
+    for share_tables, report in reports.items():
+        mean = report['mean']
+        print(f"{'partagées' if share_tables else 'copiées':<12} {mean.get('rss', 0):>10.1f} "
+              f"{mean.get('pss', 0):>10.1f} {mean.get('private', 0):>10.1f}")
+    return reports
+
+
+if __name__ == "__main__":
+    benchmark_evaluators()
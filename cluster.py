@@ -0,0 +1,270 @@
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.connection import Listener, Client
+from pathlib import Path
+from game_rendering import GraphicalRendering, PLAYER_NAMES
+from result_store import ResultStore, CheckpointShards
+
+"""
+Exécution d'une série de simulations sur plusieurs machines.
+Un coordinateur distribue des plages de numéros de simulation à des workers connectés par
+multiprocessing.connection (TCP "hôte:port" ou socket Unix), fusionne leurs résumés compacts
+(result_store.summarize) et redonne à un autre worker la plage d'un worker mort ou trop lent.
+Pendant le calcul d'une plage, le worker envoie un battement de cœur toutes les HEARTBEAT_INTERVAL secondes :
+une machine arrêtée sans fermer sa connexion (coupure de courant, réseau) perd sa plage après heartbeat_timeout.
+
+Protocole (objets picklés, connexion authentifiée par authkey) :
+- coordinateur -> worker : ("run", [numéros de simulation], paramètres) ou ("stop",)
+- worker -> coordinateur : ("heartbeat",) pendant le calcul, puis ("results", [(numéro de simulation, résumé), ...])
+Attention : pickle n'est sûr qu'entre machines de confiance partageant la clé.
+
+Test sur une seule machine :
+    python cluster.py coordinator --address 127.0.0.1:6000 --simulations 20 --seed 1
+    python cluster.py worker --address 127.0.0.1:6000    (dans plusieurs terminaux)
+"""
+AUTHKEY_ENV = "POKER_CLUSTER_AUTHKEY"
+HEARTBEAT_INTERVAL = 10.0  # Secondes entre deux battements de cœur d'un worker
+HEARTBEAT_TIMEOUT = 60.0  # Silence maximal d'un worker avant de redonner sa plage
+
+
+def parse_address(address):
+    """
+    "hôte:port" -> (hôte, port) pour TCP, sinon chemin d'un socket Unix.
+    """
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return host, int(port)
+    return address
+
+
+class Coordinator:
+    """
+    Distribue les simulations manquantes par plages et collecte les résumés.
+    """
+    def __init__(self, address, authkey, n_simulations, initial_stack=1000, seed=None, range_size=4,
+                 task_timeout=None, checkpoint_dir=None, resume=None, heartbeat_timeout=HEARTBEAT_TIMEOUT):
+        """
+        arg: address --> Adresse d'écoute ((hôte, port) ou chemin de socket Unix).
+        arg: authkey --> Clé partagée avec les workers (bytes).
+        arg: n_simulations --> Nombre de simulations de la série.
+        arg: initial_stack, seed --> Paramètres transmis aux workers (voir run_multiple_simulations).
+        arg: range_size --> Nombre de simulations par plage envoyée à un worker.
+        arg: task_timeout --> Délai maximal (secondes) d'une plage avant de la considérer perdue (None = illimité).
+        arg: checkpoint_dir --> Répertoire de points de reprise (CheckpointShards) - optionnel.
+        arg: resume --> Reprendre les points de reprise existants (None = seulement si une graine est donnée).
+        arg: heartbeat_timeout --> Silence maximal (secondes) d'un worker pendant une plage avant de la considérer perdue.
+        """
+        self.n_simulations = n_simulations
+        self.params = {'initial_stack': initial_stack, 'save_results': False, 'save_dir': '', 'seed': seed}
+        self.task_timeout = task_timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.summaries = {}
+        self.workers_seen = 0
+        self.reassigned = 0
+
+        self.checkpoints = None
+        if checkpoint_dir is not None:
+            if resume is None:
+                resume = seed is not None
+            self.checkpoints = CheckpointShards(checkpoint_dir, {'initial_stack': initial_stack, 'seed': seed,
+                                                                 'player_names': PLAYER_NAMES}, overwrite=not resume)
+            for sim_num, summary in self.checkpoints.summaries():
+                if sim_num < n_simulations:
+                    self.summaries[sim_num] = summary
+
+        pending = [sim_num for sim_num in range(n_simulations) if sim_num not in self.summaries]
+        self.pending = deque(pending[i:i + range_size] for i in range(0, len(pending), range_size))
+        self._cond = threading.Condition()
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+
+    @property
+    def done(self):
+        return len(self.summaries) >= self.n_simulations
+
+    def run(self, progress_interval=5.0):
+        """
+        Accepte les workers et attend que toutes les simulations soient terminées.
+        return: Liste des résumés triés par numéro de simulation.
+        """
+        accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        accept_thread.start()
+        start_time = last_progress = time.monotonic()
+        resumed = len(self.summaries)
+        with self._cond:
+            while not self.done:
+                self._cond.wait(progress_interval)
+                now = time.monotonic()
+                if now - last_progress >= progress_interval or self.done:
+                    GraphicalRendering._print_progress(len(self.summaries) - resumed, self.n_simulations - resumed,
+                                                       start_time)
+                    last_progress = now
+            self._cond.notify_all()
+        self.listener.close()
+        return [self.summaries[sim_num] for sim_num in sorted(self.summaries)]
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return  # listener fermé : série terminée
+            with self._cond:
+                self.workers_seen += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _wait_results(self, conn, task):
+        """
+        Attend les résultats d'une plage en acceptant les battements de cœur du worker.
+        Lève TimeoutError si le worker se tait plus de heartbeat_timeout secondes ou dépasse task_timeout.
+        """
+        deadline = time.monotonic() + self.task_timeout if self.task_timeout is not None else None
+        while True:
+            wait = self.heartbeat_timeout
+            if deadline is not None:
+                wait = min(wait, max(deadline - time.monotonic(), 0.0))
+            if not conn.poll(wait):
+                raise TimeoutError(f"plage {task[0]}-{task[-1]} sans réponse")
+            message = conn.recv()
+            if message[0] == "results":
+                return message[1]
+
+    def _serve(self, conn):
+        task = None
+        try:
+            while True:
+                with self._cond:
+                    while not self.done and not self.pending:
+                        self._cond.wait(0.5)
+                    if self.done:
+                        conn.send(("stop",))
+                        return
+                    task = self.pending.popleft()
+
+                conn.send(("run", task, self.params))
+                results = self._wait_results(conn, task)
+
+                with self._cond:
+                    # Une plage réattribuée peut être rendue deux fois : seul le premier résultat compte
+                    new = [(sim_num, summary) for sim_num, summary in results if sim_num not in self.summaries]
+                    if self.checkpoints is not None:
+                        self.checkpoints.write_shard(new)
+                    self.summaries.update(new)
+                    task = None
+                    self._cond.notify_all()
+        except (EOFError, OSError, TimeoutError):
+            # Worker mort, déconnecté ou trop lent : sa plage est redonnée à un autre worker
+            with self._cond:
+                if task is not None:
+                    missing = [sim_num for sim_num in task if sim_num not in self.summaries]
+                    if missing:
+                        self.pending.appendleft(missing)
+                        self.reassigned += 1
+                    self._cond.notify_all()
+        finally:
+            conn.close()
+
+
+def _send_heartbeats(conn, send_lock, finished):
+    # Un battement toutes les HEARTBEAT_INTERVAL secondes jusqu'à la fin du calcul de la plage
+    while not finished.wait(HEARTBEAT_INTERVAL):
+        try:
+            with send_lock:
+                conn.send(("heartbeat",))
+        except OSError:
+            return
+
+
+def run_worker(address, authkey, processes=1):
+    """
+    Se connecte au coordinateur et exécute les plages reçues jusqu'au message "stop".
+    arg: processes --> Nombre de processus locaux (> 1 : Pool sur la machine du worker).
+    return: Nombre de simulations effectuées.
+    """
+    done = 0
+    pool = Pool(processes) if processes > 1 else None
+    try:
+        with Client(address, authkey=authkey) as conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    break
+                if message[0] == "stop":
+                    break
+                _, sim_nums, params = message
+                run_chunk = partial(GraphicalRendering._run_simulation_chunk_static, **params)
+
+                # Battements de cœur envoyés par un thread pendant le calcul de la plage
+                send_lock = threading.Lock()
+                finished = threading.Event()
+                heartbeat = threading.Thread(target=_send_heartbeats, args=(conn, send_lock, finished), daemon=True)
+                heartbeat.start()
+                try:
+                    if pool is not None:
+                        results = [item for chunk in pool.imap_unordered(run_chunk, [[s] for s in sim_nums])
+                                   for item in chunk]
+                    else:
+                        results = run_chunk(sim_nums)
+                finally:
+                    finished.set()
+                    heartbeat.join()
+                with send_lock:
+                    conn.send(("results", results))
+                done += len(results)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Série de simulations répartie sur plusieurs machines")
+    parser.add_argument("role", choices=("coordinator", "worker"))
+    parser.add_argument("--address", default="127.0.0.1:6000", help="hôte:port ou chemin de socket Unix")
+    parser.add_argument("--authkey", default=os.environ.get(AUTHKEY_ENV),
+                        help=f"clé partagée (par défaut la variable d'environnement {AUTHKEY_ENV})")
+    parser.add_argument("--simulations", type=int, default=100)
+    parser.add_argument("--initial-stack", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--resume", action=argparse.BooleanOptionalAction, default=None,
+                        help="reprendre les points de reprise de --save-dir (par défaut seulement avec --seed)")
+    parser.add_argument("--range-size", type=int, default=4)
+    parser.add_argument("--task-timeout", type=float, default=None)
+    parser.add_argument("--heartbeat-timeout", type=float, default=HEARTBEAT_TIMEOUT,
+                        help="silence maximal d'un worker (secondes) avant de redonner sa plage")
+    parser.add_argument("--save-dir", default="simulations")
+    parser.add_argument("--processes", type=int, default=1, help="processus locaux d'un worker")
+    args = parser.parse_args()
+
+    if not args.authkey:
+        parser.error(f"--authkey ou la variable {AUTHKEY_ENV} est requise")
+    address = parse_address(args.address)
+    authkey = args.authkey.encode('utf-8')
+
+    if args.role == "worker":
+        done = run_worker(address, authkey, args.processes)
+        print(f"Worker terminé: {done} simulations")
+        return
+
+    coordinator = Coordinator(address, authkey, args.simulations, args.initial_stack, args.seed, args.range_size,
+                              args.task_timeout, Path(args.save_dir) / "checkpoints", args.resume,
+                              args.heartbeat_timeout)
+    print(f"Coordinateur en écoute sur {coordinator.address}")
+    summaries = coordinator.run()
+
+    with ResultStore(Path(args.save_dir) / "results", PLAYER_NAMES, overwrite=True) as store:
+        for sim_num, summary in enumerate(summaries):
+            store.add(sim_num, summary)
+    print(f"{len(summaries)} simulations ({coordinator.workers_seen} workers, "
+          f"{coordinator.reassigned} plages réattribuées) - résultats: {store.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,116 @@
-from random import shuffle
+import numpy as np
+from utils import COLORS, VALUES
+
+# Générateur NumPy partagé par Deal et Stat (voir seed pour le rendre reproductible)
+rng = np.random.default_rng()
+
+
+def seed(value):
+    """
+    Réinitialise le générateur partagé avec une graine (l'objet rng reste le même pour tous ceux qui le référencent).
+    """
+    rng.bit_generator.state = np.random.default_rng(value).bit_generator.state
+
+
+class CardSampler:
+    """
+    Tirage sans remise par Fisher-Yates partiel sur un paquet d'entiers préalloué :
+    seules les k cartes nécessaires sont tirées, sans copie ni mélange complet du paquet.
+    """
+    def __init__(self, cards=None, generator=None):
+        """
+        arg: cards --> Cartes du paquet (entiers 0-51), None = paquet complet.
+        arg: generator --> numpy.random.Generator (None = générateur partagé du module).
+        """
+        self.rng = generator if generator is not None else rng
+        self.deck = np.arange(52, dtype=np.int64)
+        self.size = 52
+        self.top = 0
+        self._batch = None
+        if cards is not None:
+            self.reset(cards)
+
+    def reset(self, cards=None):
+        """
+        Remet toutes les cartes dans le paquet (optionnellement un nouvel ensemble de cartes).
+        Aucun mélange n'est nécessaire : le Fisher-Yates partiel reste uniforme quel que soit l'ordre de départ.
+        """
+        if cards is not None:
+            self.size = len(cards)
+            self.deck[:self.size] = cards
+        self.top = 0
+
+    def draw(self, k):
+        """
+        Tire k cartes parmi celles qui restent (Fisher-Yates partiel) et les retire du paquet.
+        return: Tableau NumPy des k cartes tirées.
+        """
+        deck = self.deck
+        for i in range(self.top, self.top + k):
+            j = i + int(self.rng.integers(self.size - i))
+            deck[i], deck[j] = deck[j], deck[i]
+        self.top += k
+        return deck[self.top - k:self.top]
+
+    def remaining(self):
+        return self.deck[self.top:self.size]
+
+    def sample_batch(self, cards, num, k):
+        """
+        Tire k cartes sans remise dans cards pour num tirages indépendants (une ligne par tirage).
+        Le tableau (num, len(cards)) est préalloué et réutilisé tant que sa forme ne change pas, mais remis
+        dans l'ordre de cards à chaque appel : le tirage ne dépend que de cards et de l'état du générateur,
+        pas des appels précédents. k étapes de Fisher-Yates vectorisées sur toutes les lignes.
+        return: Tableau (num, k) (vue sur le tampon, valable jusqu'au prochain appel).
+        """
+        cards = np.asarray(cards, dtype=np.int64)
+        n = cards.size
+        if self._batch is None or self._batch.shape != (num, n):
+            self._batch = np.empty((num, n), dtype=np.int64)
+        self._batch[:] = cards
+
+        batch = self._batch
+        rows = np.arange(num)
+        for i in range(k):
+            j = i + self.rng.integers(0, n - i, size=num)
+            picked = batch[rows, j]
+            batch[rows, j] = batch[:, i]
+            batch[:, i] = picked
+        return batch[:, :k]
+
 
 class Deal:    
-    def __init__(self):
+    def __init__(self, generator=None):
 
-        self.colors = ['D', 'H', 'S', 'C']  # Diamond: carreau , Heart: coeur, Spade: pique, Club: trèfle
-        self.values = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
-        self.cards = self.cards_init()
+        self.colors = COLORS  # Diamond: carreau , Heart: coeur, Spade: pique, Club: trèfle
+        self.values = VALUES
+        self.sampler = CardSampler(generator=generator)
         self.board = []
         self.state = 0
-    
+
+    @property
+    def cards(self):
+        """
+        Cartes encore dans le paquet (entiers 0-51).
+        """
+        return self.sampler.remaining().tolist()
+
     def cards_init(self):
         """
-        Initialisation du paquet de carte 
+        Initialisation du paquet de carte : entiers 0-51 (rang * 4 + couleur, voir utils.card_to_int).
+        Les cartes sont ensuite tirées au fur et à mesure (Fisher-Yates partiel), sans mélange complet.
         """
-        self.cards = [(color, value) for color in self.colors for value in self.values]
-        shuffle(self.cards)
+        self.sampler.reset()
         return self.cards
 
+    def _draw(self, k):
+        return self.sampler.draw(k).tolist()
+
     def deal_player_hand(self):
         """
         Distribue une main aléatoirement à un joueur et retire les cartes du jeu
         """
-        main = [self.cards.pop() for _ in range(2)]
+        main = self._draw(2)
         return main
 
     def deal_board(self):
@@ -33,11 +122,18 @@ class Deal:
         assert self.state < 5
         if self.state == 1:
             # Flop
-            self.board = [self.cards.pop() for _ in range(3)]
+            self.board = self._draw(3)
             return self.board
         else:
             # Après le flop on return forcément qu'une carte
-            self.board.append(self.cards.pop())
+            self.board.append(self._draw(1)[0])
             return self.board
-        
-        
\ No newline at end of file
+
+    def deal_runout(self):
+        """
+        Complète le board jusqu'à la river en un seul tirage (tapis : plus aucun tour d'enchères)
+        Renvoie le board complet
+        """
+        self.board = self.board + self._draw(5 - len(self.board))
+        self.state = 4
+        return self.board
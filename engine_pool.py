@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from functools import partial
+from pathlib import Path
+from multiprocessing import cpu_count, get_context
+import utils
+from utils import evaluate_batch, SHARED_TABLES_ENV, EVALUATOR_TABLES
+from stats import equity_cache, load_preflop_table
+
+"""
+Pool de processus persistant pour enchaîner plusieurs séries de simulations.
+Chaque processus est initialisé une seule fois (imports, tables de l'évaluateur, table préflop)
+puis garde son cache d'équité d'une série à l'autre ; les statistiques de chaque processus
+sont renvoyées avec chaque tâche (voir worker_stats).
+
+Avec share_tables (désactivé par défaut), les tableaux NumPy de l'évaluateur sont publiés une fois en fichiers .npy
+(publish_tables) puis ouverts en memory-map par chaque processus, ce qui évite de les recalculer à l'import avec
+spawn/forkserver (~0,7 s par processus). Le gain mémoire est négligeable : ces tableaux font ~1 Mo, et le dict et
+les listes Python de l'évaluateur scalaire (~8 Mo) restent propres à chaque processus. Avec fork, les processus
+partagent déjà les tables du parent en copie à l'écriture. La table préflop est déjà ouverte en memory-map
+(stats.load_preflop_table). benchmark.benchmark_shared_tables mesure la mémoire avec et sans partage.
+"""
+
+
+def publish_tables(directory):
+    """
+    Écrit les tables partagées dans directory (un fichier <nom>.npy par table).
+    return: Chemin du répertoire.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in EVALUATOR_TABLES:
+        np.save(directory / f"{name}.npy", np.asarray(getattr(utils, name)))
+    return directory
+
+
+def attach_tables(directory):
+    """
+    Remplace les tables du processus courant par les tables publiées, en memory-map lecture seule.
+    """
+    for name, table in utils.load_shared_tables(directory).items():
+        setattr(utils, name, table)
+
+
+def memory_usage():
+    """
+    Mémoire du processus courant en Mo : rss, pss (pages partagées divisées entre les processus qui les utilisent)
+    et private (pages propres au processus). Sans /proc (hors Linux), seul le pic de rss est disponible.
+    """
+    fields = {'Rss': 'rss', 'Pss': 'pss', 'Private_Clean': 'private', 'Private_Dirty': 'private'}
+    try:
+        usage = {}
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    usage[fields[key]] = usage.get(fields[key], 0.0) + int(value.split()[0]) / 1024
+        return usage
+    except OSError:
+        import resource
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+_worker_info = None
+
+
+def _init_worker(tables_dir=None):
+    """
+    Initialisation d'un processus du pool : tables partagées attachées (tables_dir), table préflop chargée
+    et évaluateur appelé une fois (les tables de utils sont construites ou ouvertes à l'import).
+    """
+    global _worker_info
+    start = time.perf_counter()
+    if tables_dir is not None:
+        attach_tables(tables_dir)
+    load_preflop_table()
+    evaluate_batch(np.arange(7).reshape(1, 7))
+    _worker_info = {
+        'pid': os.getpid(),
+        'init_seconds': time.perf_counter() - start,
+        'tasks': 0,
+    }
+
+
+def _run_task(func, *args):
+    result = func(*args)
+    _worker_info['tasks'] += 1
+    stats = dict(_worker_info)
+    stats['equity_cache'] = equity_cache.info()
+    stats['memory'] = memory_usage()
+    return result, stats
+
+
+class EnginePool:
+    """
+    Pool de processus réutilisable par GraphicalRendering.run_multiple_simulations(engine_pool=...).
+    """
+    def __init__(self, processes=None, share_tables=False, start_method=None):
+        """
+        arg: processes --> Nombre de processus (None = nombre de CPUs).
+        arg: share_tables --> Publier les tables de l'évaluateur une fois et les partager entre les processus
+                              (voir publish_tables) ; modifie la variable d'environnement SHARED_TABLES_ENV
+                              du processus parent tant que le pool est ouvert.
+        arg: start_method --> Méthode de démarrage des processus ("fork", "spawn", "forkserver", None = défaut).
+        """
+        self.processes = processes or cpu_count()
+        self.share_tables = share_tables
+        self.tables_dir = None
+        self._previous_env = os.environ.get(SHARED_TABLES_ENV)
+        if share_tables:
+            self.tables_dir = publish_tables(tempfile.mkdtemp(prefix="poker_tables_"))
+            # Lue à l'import de utils par les processus démarrés avec spawn/forkserver
+            os.environ[SHARED_TABLES_ENV] = str(self.tables_dir)
+        self._pool = get_context(start_method).Pool(processes=self.processes, initializer=_init_worker,
+                                                    initargs=(self.tables_dir,))
+        self.worker_stats = {}  # pid -> dernières statistiques renvoyées par ce processus
+        self.tasks = 0
+
+    def imap_unordered(self, func, iterable):
+        """
+        Comme Pool.imap_unordered (func doit être picklable), en relevant les statistiques des processus.
+        """
+        for result, stats in self._pool.imap_unordered(partial(_run_task, func), iterable):
+            self.worker_stats[stats['pid']] = stats
+            self.tasks += 1
+            yield result
+
+    def cache_stats(self):
+        """
+        Statistiques du cache d'équité : total sur les processus ayant déjà travaillé, puis détail par processus.
+        """
+        caches = {pid: stats['equity_cache'] for pid, stats in self.worker_stats.items()}
+        hits = sum(cache['hits'] for cache in caches.values())
+        misses = sum(cache['misses'] for cache in caches.values())
+        return {
+            'workers': len(caches),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'per_worker': caches,
+        }
+
+    def memory_report(self):
+        """
+        Mémoire (Mo) de chaque processus à la fin de sa dernière tâche et moyenne par processus.
+        """
+        per_worker = {pid: stats['memory'] for pid, stats in self.worker_stats.items()}
+        keys = set().union(*per_worker.values()) if per_worker else set()
+        mean = {key: sum(m.get(key, 0.0) for m in per_worker.values()) / len(per_worker) for key in sorted(keys)}
+        return {'share_tables': self.share_tables, 'mean': mean, 'per_worker': per_worker}
+
+    def _release_tables(self):
+        if self.tables_dir is None:
+            return
+        if self._previous_env is None:
+            os.environ.pop(SHARED_TABLES_ENV, None)
+        else:
+            os.environ[SHARED_TABLES_ENV] = self._previous_env
+        shutil.rmtree(self.tables_dir, ignore_errors=True)
+        self.tables_dir = None
+
+    def terminate(self):
+        self._pool.terminate()
+        self._pool.join()
+        self._release_tables()
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+        self._release_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,124 @@
+import json
+from collections import deque
+
+"""
+Journal d'événements du moteur (actions des joueurs, fin de main...).
+Game n'écrit rien sur la console : chaque événement est envoyé à un "sink" avec un niveau,
+et un événement sous le niveau du sink n'est même pas construit (voir enabled).
+- NullSink : ignore tout (mode par défaut, aucune I/O dans la boucle de jeu).
+- RingBufferSink : garde les derniers événements en mémoire.
+- JsonlSink : écrit un événement par ligne dans un fichier JSON Lines.
+- PrintSink : affiche les événements (usage interactif).
+"""
+DEBUG, INFO, WARNING = 10, 20, 30
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning"}
+
+
+def _to_json(value):
+    # Scalaires NumPy (np.int64, np.float32...) vers types Python
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+class NullSink:
+    """
+    Sink sans effet : aucun événement n'est construit ni conservé.
+    """
+    level = WARNING + 1
+
+    def enabled(self, level):
+        return False
+
+    def emit(self, level, event, data):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingBufferSink:
+    """
+    Conserve les capacity derniers événements en mémoire (les plus anciens sont écrasés).
+    """
+    def __init__(self, capacity=1000, level=DEBUG):
+        """
+        arg: capacity --> Nombre maximal d'événements conservés.
+        arg: level --> Niveau minimal des événements conservés.
+        """
+        self.level = level
+        self.events = deque(maxlen=capacity)
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def emit(self, level, event, data):
+        if level >= self.level:
+            self.events.append((LEVEL_NAMES.get(level, level), event, data))
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """
+    Écrit chaque événement sur une ligne JSON ({"level", "event", ...données}) dans un fichier.
+    Les lignes sont mises en tampon et écrites par paquets de buffer_size.
+    """
+    def __init__(self, path, level=INFO, buffer_size=256):
+        """
+        arg: path --> Fichier de sortie (ouvert en ajout).
+        arg: level --> Niveau minimal des événements écrits.
+        arg: buffer_size --> Nombre de lignes gardées en mémoire avant écriture.
+        """
+        self.level = level
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def emit(self, level, event, data):
+        if level < self.level:
+            return
+        record = {"level": LEVEL_NAMES.get(level, level), "event": event}
+        record.update(data)
+        self._buffer.append(json.dumps(record, ensure_ascii=False, default=_to_json))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PrintSink:
+    """
+    Affiche les événements sur la sortie standard (équivalent de l'ancien print(action)).
+    """
+    def __init__(self, level=DEBUG):
+        self.level = level
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def emit(self, level, event, data):
+        if level >= self.level:
+            print(event, data)
+
+    def close(self):
+        pass
@@ -2,11 +2,19 @@ import matplotlib.pyplot as plt
 import numpy as np
 from typing import Dict, List, Optional
 import json
+import random
+import time
 from pathlib import Path
 from Game import Game
+from history import GameHistory, read_history_stream
+from result_store import ResultStore, CheckpointShards, summarize
+import deal
+from stats import equity_cache
 from multiprocessing import Pool, cpu_count
 from functools import partial
 
+PLAYER_NAMES = ['calling_station', 'tag', 'lag', 'maniac', 'nit', 'best_choice']
+
 
 class GraphicalRendering:
     """
@@ -49,8 +57,33 @@ class GraphicalRendering:
         Returns:
             Dict contenant les données de simulation
         """
+        if str(filepath).endswith(('.jsonl', '.jsonl.gz')):
+            return self.load_jsonl(filepath)
         with open(filepath, 'r', encoding='utf-8') as f:
             return json.load(f)
+
+    def load_jsonl(self, filepath: str) -> Dict:
+        """
+        Charge une simulation écrite au fil de l'eau (Game.simulation(stream_path=...))
+        ligne par ligne, sans lire tout le fichier en mémoire
+        
+        Args:
+            filepath: Chemin vers le fichier JSON Lines (.jsonl ou .jsonl.gz)
+            
+        Returns:
+            Dict au même format que load_json, l'historique étant stocké en colonnes (GameHistory)
+        """
+        data = {}
+        history = None
+        for record_type, record in read_history_stream(filepath):
+            if record_type == "summary":
+                data.update(record)
+            else:
+                if history is None:
+                    history = GameHistory(record['final_stacks'].keys())
+                history.append_record(record)
+        data['game_history'] = history if history is not None else []
+        return data
     
     def plot_stack_evolution(self, data: Dict, save_path: Optional[str] = None):
         """
@@ -254,7 +287,7 @@ class GraphicalRendering:
     
     @staticmethod
     def _run_single_simulation_static(sim_num: int, initial_stack: int, 
-                                     save_results: bool, save_dir: str) -> Dict:
+                                     save_results: bool, save_dir: str, seed: Optional[int] = None) -> Dict:
         """
         Lance une simulation unique (pour multiprocessing) - méthode statique
         
@@ -263,10 +296,15 @@ class GraphicalRendering:
             initial_stack: Stack initial pour chaque joueur
             save_results: Sauvegarder les résultats individuels
             save_dir: Répertoire pour sauvegarder les résultats
+            seed: Graine de la série (optionnel) : la simulation sim_num est alors reproductible,
+                  quel que soit le processus ou l'ordre dans lequel elle est lancée
             
         Returns:
             Dict contenant les résultats de la simulation
         """
+        if seed is not None:
+            GraphicalRendering._seed_simulation(seed, sim_num)
+        
         # Créer une nouvelle partie
         game = Game(stack=initial_stack)
         
@@ -280,15 +318,86 @@ class GraphicalRendering:
         
         return results
     
+    @staticmethod
+    def _seed_simulation(seed: int, sim_num: int):
+        """
+        Initialise tous les générateurs aléatoires (cartes, décisions, NumPy) pour la simulation sim_num
+        et vide le cache d'équité du processus, dont le contenu dépend des simulations précédentes
+        """
+        value = int(np.random.SeedSequence([seed, sim_num]).generate_state(1)[0])
+        deal.seed(value)
+        random.seed(value)
+        np.random.seed(value)
+        equity_cache.clear(reset_stats=False)
+
+    @staticmethod
+    def _run_simulation_chunk_static(sim_nums: List[int], initial_stack: int,
+                                     save_results: bool, save_dir: str, seed: Optional[int] = None) -> List:
+        """
+        Lance un paquet de simulations (pour multiprocessing) et ne renvoie que des résumés compacts
+        
+        Args:
+            sim_nums: Numéros des simulations du paquet
+            initial_stack, save_results, save_dir, seed: voir _run_single_simulation_static
+            
+        Returns:
+            Liste de couples (numéro de simulation, résumé) - voir result_store.summarize
+        """
+        return [(sim_num, summarize(GraphicalRendering._run_single_simulation_static(
+                    sim_num, initial_stack, save_results, save_dir, seed), PLAYER_NAMES))
+                for sim_num in sim_nums]
+
+    @staticmethod
+    def _guided_chunks(sim_nums: List[int], n_proc: int) -> List[List[int]]:
+        """
+        Découpe les simulations en paquets de taille décroissante (ordonnancement guidé) :
+        gros paquets au début pour limiter les échanges entre processus, paquets d'une seule
+        simulation en fin de lot pour qu'aucun processus ne reste inactif sur un long tournoi
+        """
+        sim_nums = list(sim_nums)
+        chunks = []
+        start = 0
+        while start < len(sim_nums):
+            size = max(1, (len(sim_nums) - start) // (4 * n_proc))
+            chunks.append(sim_nums[start:start + size])
+            start += size
+        return chunks
+
+    @staticmethod
+    def _print_progress(done: int, total: int, start_time: float):
+        """
+        Affiche l'avancement avec le débit (simulations/s) et le temps restant estimé
+        """
+        elapsed = time.monotonic() - start_time
+        rate = done / elapsed if elapsed > 0 else 0.0
+        if rate > 0:
+            eta = (total - done) / rate
+            eta_text = f"{int(eta // 60)}:{int(eta % 60):02d}"
+        else:
+            eta_text = "?"
+        print(f"Progression: {done}/{total} simulations terminées ({rate:.2f} simulations/s, reste ~{eta_text})")
+
     def run_multiple_simulations(self, n_simulations: int = 1000, 
                                 initial_stack: int = 1000,
                                 save_results: bool = True,
                                 save_dir: str = "simulations",
                                 use_multiprocessing: bool = True,
-                                n_processes: Optional[int] = None):
+                                n_processes: Optional[int] = None,
+                                save_format: str = "store",
+                                progress_interval: float = 2.0,
+                                seed: Optional[int] = None,
+                                engine_pool=None,
+                                resume: Optional[bool] = None):
         """
         Lance plusieurs simulations et affiche les résultats moyens
         
+        Les simulations sont réparties par paquets de taille décroissante (imap_unordered) ;
+        chaque résumé est intégré aux agrégats dès son arrivée, dans l'ordre de fin des simulations.
+        Avec save_results, chaque paquet terminé est aussi écrit en point de reprise dans save_dir/checkpoints
+        (CheckpointShards) : une relance avec les mêmes stack initial et graine ne calcule que les simulations
+        manquantes et fusionne les résumés déjà enregistrés. Sans graine, une relance repart de zéro
+        (sauf resume=True).
+        
         Args:
             n_simulations: Nombre de simulations à lancer
             initial_stack: Stack initial pour chaque joueur
@@ -296,66 +405,124 @@ class GraphicalRendering:
             save_dir: Répertoire pour sauvegarder les résultats
             use_multiprocessing: Utiliser le multiprocessing
             n_processes: Nombre de processus (None = nombre de CPUs)
+            save_format: "store" : stockage binaire columnaire unique dans save_dir/results (voir ResultStore),
+                         relu par memory-map ; "json" : un fichier simulation_NNN.json par simulation
+            progress_interval: Délai minimal (secondes) entre deux affichages de la progression
+            seed: Graine de la série (None = non reproductible) - voir _seed_simulation
+            engine_pool: Pool persistant (engine_pool.EnginePool) à utiliser à la place d'un Pool créé
+                         pour cette série ; il n'est pas fermé à la fin et peut servir aux séries suivantes
+            resume: Reprendre les points de reprise de save_dir (None = seulement si une graine est donnée) ;
+                    sinon ils sont effacés et la série recommence
+            
+        Returns:
+            Liste des résumés compacts (result_store.summarize) triés par numéro de simulation
         """
+        if save_format not in ("store", "json"):
+            raise ValueError(f"Format de sauvegarde inconnu : {save_format!r} (attendu : store, json)")
+        save_json_files = save_results and save_format == "json"
+
         if save_results:
             Path(save_dir).mkdir(exist_ok=True)
         
+        if engine_pool is not None:
+            use_multiprocessing = True
+            n_proc = engine_pool.processes
+        else:
+            n_proc = n_processes or cpu_count()
         print(f"\n{'='*60}")
         print(f"Lancement de {n_simulations} simulations")
         if use_multiprocessing:
-            n_proc = n_processes or cpu_count()
             print(f"Mode: Multiprocessing avec {n_proc} processus")
         else:
             print(f"Mode: Séquentiel")
         print(f"{'='*60}\n")
         
-        all_results = []
-        player_names = ['calling_station', 'tag', 'lag', 'maniac', 'nit', 'best_choice']
+        player_names = PLAYER_NAMES
+        summaries = {}
         
         # Accumulateurs pour les statistiques
         total_stacks = {name: [] for name in player_names}
         total_wins = {name: [] for name in player_names}
         total_games_played = []
         
-        if use_multiprocessing:
-            # Utiliser multiprocessing
-            run_sim_partial = partial(GraphicalRendering._run_single_simulation_static, 
-                                     initial_stack=initial_stack,
-                                     save_results=save_results,
-                                     save_dir=save_dir)
-            
-            with Pool(processes=n_processes) as pool:
-                # Lancer les simulations en parallèle avec barre de progression
-                print("Démarrage du multiprocessing...")
-                all_results = pool.map(run_sim_partial, range(n_simulations))
-                
-            print(f"\n{'='*60}")
-            print(f"Toutes les simulations sont terminées!")
-            print(f"{'='*60}\n")
+        # Stockage columnaire : les courbes d'évolution relisent ensuite les stacks par memory-map
+        store = ResultStore(Path(save_dir) / "results", player_names, overwrite=True) \
+            if save_results and save_format == "store" else None
+        
+        def fold(sim_num, summary):
+            # Intégrer un résumé aux agrégats (et au stockage) dès son arrivée
+            summaries[sim_num] = summary
+            total_games_played.append(summary['total_games'])
+            for i, player_name in enumerate(player_names):
+                total_stacks[player_name].append(summary['final_stacks'][i])
+                total_wins[player_name].append(summary['wins'][i])
+            if store is not None:
+                store.add(sim_num, summary)
+        
+        # Reprise : les simulations déjà enregistrées sont relues depuis leurs shards
+        # (par défaut seulement avec une graine : une série sans graine n'est pas reproductible)
+        if resume is None:
+            resume = seed is not None
+        checkpoints = None
+        if save_results:
+            checkpoints = CheckpointShards(Path(save_dir) / "checkpoints",
+                                           {'initial_stack': initial_stack, 'seed': seed, 'player_names': player_names},
+                                           overwrite=not resume)
+            for sim_num, summary in checkpoints.summaries():
+                if sim_num < n_simulations:
+                    fold(sim_num, summary)
+            if summaries:
+                print(f"Reprise: {len(summaries)}/{n_simulations} simulations déjà terminées")
+        pending = [sim_num for sim_num in range(n_simulations) if sim_num not in summaries]
+        
+        run_chunk = partial(GraphicalRendering._run_simulation_chunk_static,
+                            initial_stack=initial_stack,
+                            save_results=save_json_files,
+                            save_dir=save_dir,
+                            seed=seed)
+        
+        pool = None
+        if engine_pool is not None:
+            chunk_results = engine_pool.imap_unordered(run_chunk, self._guided_chunks(pending, n_proc))
+        elif use_multiprocessing and pending:
+            pool = Pool(processes=n_proc)
+            chunk_results = pool.imap_unordered(run_chunk, self._guided_chunks(pending, n_proc))
         else:
-            # Mode séquentiel (ancien code)
-            for sim_num in range(n_simulations):
-                results = GraphicalRendering._run_single_simulation_static(
-                    sim_num, initial_stack, save_results, save_dir)
-                all_results.append(results)
+            chunk_results = map(run_chunk, ([sim_num] for sim_num in pending))
+        
+        start_time = time.monotonic()
+        last_progress = start_time
+        resumed = len(summaries)
+        try:
+            for chunk in chunk_results:
+                if checkpoints is not None:
+                    checkpoints.write_shard(chunk)
+                for sim_num, summary in chunk:
+                    fold(sim_num, summary)
                 
-                # Afficher la progression
-                if (sim_num + 1) % 10 == 0:
-                    print(f"Progression: {sim_num + 1}/{n_simulations} simulations terminées")
-            
-            print(f"\n{'='*60}")
-            print(f"Toutes les simulations sont terminées!")
-            print(f"{'='*60}\n")
-        
-        # Accumuler les statistiques
-        game_histories = []  # Stocker les historiques de jeu pour les courbes d'évolution
-        for results in all_results:
-            total_games_played.append(results['total_games'])
-            game_histories.append(results.get('game_history', []))
-            for player_name in player_names:
-                stats = results['player_stats'][player_name]
-                total_stacks[player_name].append(stats['final_stack'])
-                total_wins[player_name].append(stats['wins'])
+                now = time.monotonic()
+                if now - last_progress >= progress_interval or len(summaries) == n_simulations:
+                    self._print_progress(len(summaries) - resumed, len(pending), start_time)
+                    last_progress = now
+        except BaseException:
+            # Interruption : les paquets en cours sont abandonnés, les shards écrits restent utilisables
+            if pool is not None:
+                pool.terminate()
+            raise
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            if store is not None:
+                store.close()
+        
+        print(f"\n{'='*60}")
+        print(f"Toutes les simulations sont terminées!")
+        print(f"{'='*60}\n")
+        if store is not None:
+            print(f"Résultats sauvegardés: {store.directory}")
+        
+        all_results = [summaries[sim_num] for sim_num in sorted(summaries)]
         
         # Calculer et afficher les statistiques
         self._display_aggregate_stats(total_stacks, total_wins, total_games_played, 
@@ -365,10 +532,37 @@ class GraphicalRendering:
         self._plot_aggregate_results(total_stacks, total_wins, n_simulations, initial_stack)
         
         # Créer les courbes d'évolution individuelles sur toutes les simulations
-        self._plot_all_game_evolutions(game_histories, n_simulations, initial_stack, save_dir)
+        self._plot_all_game_evolutions(store if store is not None else all_results,
+                                       n_simulations, initial_stack, save_dir)
         
         return all_results
     
+    def plot_from_store(self, store_dir: str, initial_stack: int = 1000, save_dir: Optional[str] = None):
+        """
+        Réaffiche les statistiques et graphiques d'une série de simulations sauvegardée en ResultStore,
+        sans relancer les simulations ni relire de JSON (stacks lus par memory-map)
+        
+        Args:
+            store_dir: Répertoire du stockage (ex. "simulations/results")
+            initial_stack: Stack initial des simulations
+            save_dir: Répertoire où écrire les graphiques d'évolution (par défaut le parent de store_dir)
+        """
+        store = ResultStore(store_dir)
+        n_simulations = len(store)
+        if n_simulations == 0:
+            print("Aucune simulation dans ce stockage")
+            return
+
+        final_stacks, wins = store.final_stacks, store.wins
+        total_stacks = {name: final_stacks[:, i].tolist() for i, name in enumerate(store.player_names)}
+        total_wins = {name: wins[:, i].tolist() for i, name in enumerate(store.player_names)}
+
+        self._display_aggregate_stats(total_stacks, total_wins, store.total_games.tolist(),
+                                      initial_stack, n_simulations)
+        self._plot_aggregate_results(total_stacks, total_wins, n_simulations, initial_stack)
+        self._plot_all_game_evolutions(store, n_simulations, initial_stack,
+                                       save_dir if save_dir is not None else str(Path(store_dir).parent))
+
     def _display_aggregate_stats(self, total_stacks, total_wins, total_games_played, 
                                  initial_stack, n_simulations):
         """
@@ -635,6 +829,57 @@ class GraphicalRendering:
         print("✓ Tous les graphiques d'évolution ont été générés et sauvegardés!")
         print(f"{'='*60}\n")
     
+    @staticmethod
+    def _stack_trajectories(game_histories):
+        """
+        Convertit les historiques en trajectoires de stacks
+        
+        Args:
+            game_histories: ResultStore, ou liste d'historiques (listes de dicts, GameHistory
+                            ou résumés de result_store.summarize)
+            
+        Returns:
+            Tuple (noms des joueurs, liste de couples (numéros de main, stacks (mains, joueurs)))
+        """
+        if isinstance(game_histories, ResultStore):
+            return game_histories.player_names, list(game_histories.trajectories())
+
+        players = None
+        for history in game_histories:
+            if isinstance(history, dict):
+                players = history['player_names']
+                break
+            if len(history):
+                players = history.player_names if isinstance(history, GameHistory) else list(history[0]['final_stacks'])
+                break
+        if players is None:
+            return [], []
+
+        trajectories = []
+        for history in game_histories:
+            if isinstance(history, dict):
+                columns = [history['player_names'].index(p) for p in players]
+                trajectories.append((history['game_numbers'], history['stacks'][:, columns]))
+            elif isinstance(history, GameHistory):
+                columns = [history.player_names.index(p) for p in players]
+                trajectories.append((history.game_number[:len(history)], history.stacks[:len(history)][:, columns]))
+            else:
+                trajectories.append((np.array([game['game_number'] for game in history], dtype=np.int32),
+                                     np.array([[game['final_stacks'][p] for p in players] for game in history],
+                                              dtype=np.float64).reshape(-1, len(players))))
+        return players, trajectories
+
+    @staticmethod
+    def _stack_matrix(trajectories, player_idx, max_length):
+        """
+        Matrice (simulations, parties) des stacks d'un joueur, NaN après la fin de chaque simulation
+        """
+        stack_matrix = np.full((len(trajectories), max_length), np.nan)
+        for sim_idx, (_, stacks) in enumerate(trajectories):
+            length = min(len(stacks), max_length)
+            stack_matrix[sim_idx, :length] = stacks[:length, player_idx]
+        return stack_matrix
+
     def _plot_all_game_evolutions(self, game_histories, n_simulations, 
                                  initial_stack, save_dir):
         """
@@ -642,7 +887,8 @@ class GraphicalRendering:
         sur toutes les simulations (100 courbes par joueur)
         
         Args:
-            game_histories: Liste des historiques de jeu pour chaque simulation
+            game_histories: Liste des historiques de jeu pour chaque simulation (listes de dicts ou GameHistory),
+                            ou ResultStore dont les stacks sont lus par memory-map
             n_simulations: Nombre de simulations
             initial_stack: Stack initial
             save_dir: Répertoire pour sauvegarder les graphiques
@@ -655,13 +901,12 @@ class GraphicalRendering:
         plots_dir = Path(save_dir) / "plots"
         plots_dir.mkdir(exist_ok=True, parents=True)
         
-        # Récupérer les noms des joueurs
-        if not game_histories or not game_histories[0]:
+        # Récupérer les noms des joueurs et les trajectoires de stacks (numéros de main, stacks)
+        players, trajectories = self._stack_trajectories(game_histories)
+        if not trajectories or len(trajectories[0][0]) == 0:
             print("Pas d'historique de jeu disponible")
             return
         
-        players = list(game_histories[0][0]['final_stacks'].keys())
-        
         # Créer un graphique pour chaque joueur
         for player in players:
             print(f"  Génération du graphique pour {player.replace('_', ' ').title()}...")
@@ -673,20 +918,16 @@ class GraphicalRendering:
             all_final_stacks = []
             max_games = 0
             
-            for sim_idx, history in enumerate(game_histories):
-                if not history:
+            player_idx = players.index(player)
+            for sim_idx, (game_numbers, stacks) in enumerate(trajectories):
+                if len(game_numbers) == 0:
                     continue
                 
-                # Extraire l'évolution du stack pour ce joueur dans cette simulation
-                game_numbers = []
-                stack_evolution = []
-                
-                for game in history:
-                    game_numbers.append(game['game_number'])
-                    stack_evolution.append(game['final_stacks'][player])
+                # Évolution du stack pour ce joueur dans cette simulation (colonne, sans copie)
+                stack_evolution = stacks[:, player_idx]
                 
                 max_games = max(max_games, len(game_numbers))
-                all_final_stacks.append(stack_evolution[-1] if stack_evolution else initial_stack)
+                all_final_stacks.append(stack_evolution[-1] if len(stack_evolution) else initial_stack)
                 
                 # Tracer la courbe avec transparence
                 ax.plot(game_numbers, stack_evolution, 
@@ -695,14 +936,7 @@ class GraphicalRendering:
             # Calculer et tracer la moyenne de toutes les simulations
             # Créer une matrice pour stocker toutes les évolutions
             max_length = max_games
-            stack_matrix = np.full((n_simulations, max_length), np.nan)
-            
-            for sim_idx, history in enumerate(game_histories):
-                if not history:
-                    continue
-                for game_idx, game in enumerate(history):
-                    if game_idx < max_length:
-                        stack_matrix[sim_idx, game_idx] = game['final_stacks'][player]
+            stack_matrix = self._stack_matrix(trajectories, player_idx, max_length)
             
             # Calculer la moyenne en ignorant les NaN
             mean_evolution = np.nanmean(stack_matrix, axis=0)
@@ -777,19 +1011,8 @@ class GraphicalRendering:
             color = self.colors.get(player, '#000000')
             
             # Recalculer la moyenne pour ce joueur
-            max_length = 0
-            for history in game_histories:
-                if history:
-                    max_length = max(max_length, len(history))
-            
-            stack_matrix = np.full((n_simulations, max_length), np.nan)
-            
-            for sim_idx, history in enumerate(game_histories):
-                if not history:
-                    continue
-                for game_idx, game in enumerate(history):
-                    if game_idx < max_length:
-                        stack_matrix[sim_idx, game_idx] = game['final_stacks'][player]
+            max_length = max(len(game_numbers) for game_numbers, _ in trajectories)
+            stack_matrix = self._stack_matrix(trajectories, players.index(player), max_length)
             
             mean_evolution = np.nanmean(stack_matrix, axis=0)
             game_range = list(range(1, max_length + 1))
@@ -824,7 +1047,7 @@ class GraphicalRendering:
         Génère tous les graphiques à partir d'un fichier JSON
         
         Args:
-            json_path: Chemin vers le fichier JSON
+            json_path: Chemin vers le fichier JSON (ou JSON Lines écrit en streaming)
             save_plots: Sauvegarder les graphiques
             output_dir: Répertoire de sortie pour les graphiques
         """
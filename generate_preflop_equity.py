@@ -0,0 +1,47 @@
+import time
+import argparse
+import numpy as np
+from stats import batch_equity, PREFLOP_EQUITY_PATH, PREFLOP_MAX_OPPONENTS
+
+
+def canonical_hand(index):
+    """
+    Main représentative (entiers 0-51) pour un index de la grille 13x13 (voir stats.preflop_index).
+    """
+    row, col = divmod(index, 13)
+    if row == col:
+        return [row * 4, row * 4 + 1]  # Paire
+    if row > col:
+        return [row * 4, col * 4]  # Suited : même couleur
+    return [col * 4, row * 4 + 1]  # Offsuit : couleurs différentes
+
+
+def generate_preflop_equity(num_simulations=50_000, path=PREFLOP_EQUITY_PATH):
+    """
+    Calcule l'équité des 169 mains de départ canoniques contre 1 à 5 adversaires aléatoires
+    et l'enregistre au format .npy (float32, forme (169, 5)) pour être lue en memory-map par Stat.
+    arg: num_simulations --> Nombre de simulations Monte Carlo par case de la table.
+    arg: path --> Fichier de sortie.
+    """
+    table = np.zeros((169, PREFLOP_MAX_OPPONENTS), dtype=np.float32)
+    start = time.perf_counter()
+
+    for index in range(169):
+        hand = canonical_hand(index)
+        available = [card for card in range(52) if card not in hand]
+        for num_opponents in range(1, PREFLOP_MAX_OPPONENTS + 1):
+            table[index, num_opponents - 1] = batch_equity(hand, [], available, num_simulations, num_opponents)
+
+        if (index + 1) % 13 == 0:
+            print(f"Progression: {index + 1}/169 mains ({time.perf_counter() - start:.0f}s)")
+
+    np.save(path, table)
+    print(f"Table d'équité préflop sauvegardée: {path}")
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère la table d'équité préflop (169 mains x 1-5 adversaires)")
+    parser.add_argument("--simulations", type=int, default=50_000)
+    args = parser.parse_args()
+    generate_preflop_equity(args.simulations)
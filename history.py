@@ -0,0 +1,186 @@
+import gzip
+import json
+import time
+import numpy as np
+from utils import ints_to_cards, to_ints
+
+"""
+Historique des mains d'une simulation stocké en colonnes NumPy préallouées (agrandies par doublement) :
+- game_number (int32), pot (int32)
+- winners (uint8) : masque de bits des gagnants (bit i = joueur i), un partage de pot a plusieurs bits
+- board (uint8, (N, 5)) : cartes 0-51, NO_CARD pour les cartes non distribuées
+- stacks (int32, (N, nb joueurs)) : stacks de tous les joueurs après la main
+Une ligne coûte 14 + 4 * nb joueurs octets, au lieu d'un dict avec tuples et dict de stacks par main.
+"""
+NO_CARD = 255
+
+
+class GameHistory:
+    """
+    Historique columnaire des mains. Se parcourt comme l'ancienne liste de dicts
+    (len, index, itération, to_dicts) pour rester compatible avec le rendu et l'export JSON.
+    """
+    def __init__(self, player_names, capacity=64):
+        """
+        arg: player_names --> Noms des joueurs, dans l'ordre des colonnes de stacks.
+        arg: capacity --> Nombre de mains préallouées (doublé à chaque dépassement).
+        """
+        self.player_names = list(player_names)
+        self._size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        num_players = len(self.player_names)
+        columns = {
+            'game_number': np.zeros(capacity, dtype=np.int32),
+            'pot': np.zeros(capacity, dtype=np.int32),
+            'winners': np.zeros(capacity, dtype=np.uint8),
+            'board': np.full((capacity, 5), NO_CARD, dtype=np.uint8),
+            'stacks': np.zeros((capacity, num_players), dtype=np.int32),
+        }
+        for name, column in columns.items():
+            if hasattr(self, name):
+                column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+
+    def append(self, game_number, pot, winner_indices, board, stacks):
+        """
+        Ajoute une main.
+        arg: winner_indices --> Indices des gagnants dans player_names.
+        arg: board --> Board final (entiers 0-51, 0 à 5 cartes).
+        arg: stacks --> Stacks de tous les joueurs après la main (ordre de player_names).
+        """
+        if self._size == len(self.pot):
+            self._allocate(2 * len(self.pot))
+        i = self._size
+        self.game_number[i] = game_number
+        self.pot[i] = pot
+        self.winners[i] = sum(1 << w for w in winner_indices)
+        self.board[i, :len(board)] = board
+        self.stacks[i] = stacks
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._size))]
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("index de main hors de l'historique")
+        return self._row(i)
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._row(i)
+
+    def _row(self, i):
+        mask = int(self.winners[i])
+        winner_names = [name for j, name in enumerate(self.player_names) if mask >> j & 1]
+        board = self.board[i]
+        return {
+            'game_number': int(self.game_number[i]),
+            'winner': winner_names[0] if len(winner_names) == 1 else winner_names,
+            'pot': int(self.pot[i]),
+            'board': ints_to_cards(board[board != NO_CARD].tolist()),
+            'final_stacks': dict(zip(self.player_names, self.stacks[i].tolist()))
+        }
+
+    def append_record(self, record):
+        """
+        Ajoute une main au format d'origine (dict game_number, winner, pot, board, final_stacks).
+        """
+        winners = record['winner'] if isinstance(record['winner'], list) else [record['winner']]
+        self.append(record['game_number'], record['pot'], [self.player_names.index(w) for w in winners],
+                    to_ints(record['board']), [record['final_stacks'][name] for name in self.player_names])
+
+    def to_dicts(self):
+        """
+        Historique au format d'origine (liste de dicts), ex. pour l'export JSON.
+        """
+        return list(self)
+
+    def win_counts(self):
+        """
+        Nombre de mains gagnées (partages compris) par joueur, dans l'ordre de player_names.
+        """
+        bits = np.arange(len(self.player_names), dtype=np.uint8)
+        return ((self.winners[:self._size, None] >> bits) & 1).sum(axis=0)
+
+    def __getstate__(self):
+        # Seules les lignes remplies sont sérialisées (retour des processus du Pool)
+        state = self.__dict__.copy()
+        for name in ('game_number', 'pot', 'winners', 'board', 'stacks'):
+            state[name] = state[name][:self._size].copy()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if len(self.pot) == 0:
+            self._allocate(1)
+
+
+def _open_text(path, mode):
+    # Compression gzip selon l'extension (.gz)
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class HistoryWriter:
+    """
+    Écrit l'historique au fil de la simulation au format JSON Lines (gzip si le chemin finit par .gz) :
+    une ligne {"type": "hand", ...} par main terminée puis une ligne {"type": "summary", ...} à la fin.
+    Les lignes restent dans un tampon borné (buffer_size) et le fichier est vidé au moins toutes les flush_interval secondes.
+    """
+    def __init__(self, path, buffer_size=64, flush_interval=5.0):
+        """
+        arg: path --> Fichier de sortie (.jsonl ou .jsonl.gz).
+        arg: buffer_size --> Nombre maximal de lignes gardées en mémoire avant écriture.
+        arg: flush_interval --> Délai maximal (secondes) entre deux vidages du fichier.
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._file = _open_text(path, 'w')
+
+    def write(self, record, record_type="hand"):
+        line = {"type": record_type}
+        line.update(record)
+        self._buffer.append(json.dumps(line, ensure_ascii=False))
+        if len(self._buffer) >= self.buffer_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_history_stream(path):
+    """
+    Relit un fichier écrit par HistoryWriter ligne par ligne, sans le charger entièrement.
+    Génère des couples (type, enregistrement), type valant "hand" ou "summary".
+    """
+    with _open_text(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record.pop("type", "hand"), record
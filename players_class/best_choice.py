@@ -5,7 +5,7 @@ class best_choice():
     def __init__(self, stack): 
         self.stack = float(stack)
     
-    def action(self, amount_to_call, position=None, optimal_choice=None, optimal_bet_amount=None, win_chance=None):
+    def action(self, amount_to_call, position=None, optimal_choice=None, optimal_bet_amount=None, win_chance=None, stats=None):
         
         # Validations
         try:
@@ -16,13 +16,16 @@ class best_choice():
         if amount < 0:
             amount = 0.0
             
-        # Si pas de choix optimal spécifié, fold par défaut
-        if optimal_choice is None:
-            return {"fold": True}
-        
         # Si stack épuisé
         if self.stack <= 0:
             return {"fold": True}
+
+        if stats is not None:
+            win_chance, optimal_choice, optimal_bet_amount = stats.equity, stats.optimal_choice, stats.optimal_bet
+
+        # Si pas de choix optimal spécifié, fold par défaut
+        if optimal_choice is None:
+            return {"fold": True}
         
         # Exécution de l'action optimale
         if optimal_choice == "check":
@@ -23,13 +23,14 @@ class Calling_station():
         self.random_call_prob = 0.08
         self.all_in_min_equity = 0.70
 
-    def action(self, amount_to_call, position=None, optimal_choice=None, optimal_bet_amount=None, win_chance=None):
+    def action(self, amount_to_call, position=None, optimal_choice=None, optimal_bet_amount=None, win_chance=None, stats=None):
         """Décide d'appeler, se coucher ou checker.
 
         Args:
             amount_to_call: montant requis pour rester dans le coup (>= 0)
             position, optimal_choice, optimal_bet_amount: paramètres présents pour compatibilité (optionnels)
             win_chance: probabilité (0..1) de gagner
+            stats: statistiques paresseuses (stats.LazyStats), l'équité n'est calculée que si la décision en dépend
 
         Returns:
             dict: une action parmi {"check": True}, {"call": amount}, {"fold": True}
@@ -41,14 +42,6 @@ class Calling_station():
         except Exception:
             amount = 0.0
 
-        if win_chance is None:
-            win = 0.0
-        else:
-            try:
-                win = float(win_chance)
-            except Exception:
-                win = 0.0
-
         # bord cases
         if self.stack <= 0:
             return {"fold": True}
@@ -60,6 +53,18 @@ class Calling_station():
         if amount <= self.small_call_threshold_percent * self.stack:
             return {"call": amount}
 
+        # Au-delà, la décision dépend de l'équité
+        if stats is not None:
+            win_chance = stats.equity
+
+        if win_chance is None:
+            win = 0.0
+        else:
+            try:
+                win = float(win_chance)
+            except Exception:
+                win = 0.0
+
         # Si l'appel exige tout (all-in adverse / on doit mettre >= stack)
         if amount >= self.stack:
             # n'appelle all-in que si équité très forte
@@ -17,7 +17,7 @@ class Lag():
         result = self.multiplicator_min + (self.multiplicator_max - self.multiplicator_min) / (1 + float(np.exp(exponent_input)))
         return float(round(result, 2))
 
-    def action(self, amount_to_call, position=None, optimal_choice=None, optimal_bet_amount=None, win_chance=None):
+    def action(self, amount_to_call, position=None, optimal_choice=None, optimal_bet_amount=None, win_chance=None, stats=None):
         
         # Validations
         try:
@@ -28,6 +28,10 @@ class Lag():
         if amount < 0:
             amount = 0.0
             
+        if stats is not None:
+            # Statistiques paresseuses : le calcul d'équité n'est lancé qu'à la première lecture
+            win_chance, optimal_choice, optimal_bet_amount = stats.equity, stats.optimal_choice, stats.optimal_bet
+
         try:
             win = float(win_chance) if win_chance is not None else 0.5
         except Exception:
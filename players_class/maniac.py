@@ -17,7 +17,7 @@ class Maniac():
         result = self.multiplicator_min + (self.multiplicator_max - self.multiplicator_min) / (1 + float(np.exp(exponent_input)))
         return float(round(result, 2))
 
-    def action(self, amount_to_call, position=None, optimal_choice=None, optimal_bet_amount=None, win_chance=None):
+    def action(self, amount_to_call, position=None, optimal_choice=None, optimal_bet_amount=None, win_chance=None, stats=None):
         # Validations
         try:
             amount = float(amount_to_call) if amount_to_call is not None else 0.0
@@ -27,6 +27,10 @@ class Maniac():
         if amount < 0:
             amount = 0.0
             
+        if stats is not None:
+            # Statistiques paresseuses : le calcul d'équité n'est lancé qu'à la première lecture
+            win_chance, optimal_choice, optimal_bet_amount = stats.equity, stats.optimal_choice, stats.optimal_bet
+
         try:
             win = float(win_chance) if win_chance is not None else 0.5
         except Exception:
@@ -0,0 +1,279 @@
+import re
+import numpy as np
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from utils import VALUES, COLORS, evaluate_batch, to_ints, cards_mask, available_cards
+from deal import CardSampler
+
+"""
+Représentation des ranges : un poids par combo pour les 1326 combos de 2 cartes.
+- COMBOS[i] : les deux cartes (entiers 0-51, c1 < c2) du combo i.
+- COMBO_MASKS[i] : masque de bits 64 bits du combo (retrait des cartes mortes en une opération vectorielle).
+- COMBO_INDEX[c1, c2] : index du combo formé par deux cartes.
+"""
+NUM_COMBOS = 1326
+COMBOS = np.array(list(combinations(range(52), 2)), dtype=np.int64)
+COMBO_MASKS = np.left_shift(np.uint64(1), COMBOS[:, 0].astype(np.uint64)) | np.left_shift(np.uint64(1), COMBOS[:, 1].astype(np.uint64))
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.int64)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(NUM_COMBOS)
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(NUM_COMBOS)
+
+_compatible = None
+
+
+def combo_compatibility():
+    """
+    Matrice (1326, 1326) : 1.0 si les deux combos ne partagent aucune carte, 0.0 sinon (calculée une fois).
+    """
+    global _compatible
+    if _compatible is None:
+        _compatible = ((COMBO_MASKS[:, None] & COMBO_MASKS[None, :]) == 0).astype(np.float64)
+    return _compatible
+
+
+def dead_combos(dead_mask):
+    """
+    Masque booléen (1326,) des combos bloqués par les cartes mortes.
+    """
+    return (COMBO_MASKS & np.uint64(dead_mask)) != 0
+
+
+"""
+Compilation de la notation de range ("TT+, AQs+, KJo, 76s-54s, A5s-A2s, AhKh, QQ:0.5") en poids par combo.
+- Paires : "TT", "TT+" (TT à AA), "TT-77".
+- Non paires : "AKs" (suited), "AKo" (offsuit), "AK" (les deux), "AQs+" (kicker jusqu'à AKs),
+  "A5s-A2s" (même carte haute, kickers de 2 à 5), "76s-54s" (connecteurs : 76s, 65s, 54s).
+- Combo précis : "AhKh" (couleurs h, d, s, c).
+- Poids optionnel ":w" après chaque élément (1 par défaut).
+"""
+_RANK_INDEX = {v: i for i, v in enumerate(VALUES)}
+_SUIT_INDEX = {c.lower(): i for i, c in enumerate(COLORS)}
+_TOKEN = re.compile(r"^([2-9TJQKA])([2-9TJQKA])([so]?)(\+?)$")
+_SPECIFIC = re.compile(r"^([2-9TJQKA])([dhsc])([2-9TJQKA])([dhsc])$")
+
+
+def _hand_combos(high, low, kind):
+    """
+    Index des combos d'une main canonique (rangs high >= low, kind : 's', 'o' ou '' pour les deux).
+    """
+    indices = []
+    for s1 in range(4):
+        for s2 in range(4):
+            if high == low and s2 <= s1:
+                continue
+            if (kind == 's' and s1 != s2) or (kind == 'o' and s1 == s2):
+                continue
+            indices.append(COMBO_INDEX[high * 4 + s1, low * 4 + s2])
+    return indices
+
+
+def _parse_hand(text):
+    match = _TOKEN.match(text)
+    if not match:
+        raise ValueError(f"Notation de range invalide : {text!r}")
+    r1, r2, kind, plus = match.groups()
+    high, low = max(_RANK_INDEX[r1], _RANK_INDEX[r2]), min(_RANK_INDEX[r1], _RANK_INDEX[r2])
+    if high == low and kind:
+        raise ValueError(f"Une paire ne peut pas être suited/offsuit : {text!r}")
+    return high, low, kind, bool(plus)
+
+
+def _element_combos(element):
+    """
+    Index des combos couverts par un élément de la notation (sans le poids).
+    """
+    specific = _SPECIFIC.match(element)
+    if specific:
+        r1, s1, r2, s2 = specific.groups()
+        c1, c2 = _RANK_INDEX[r1] * 4 + _SUIT_INDEX[s1], _RANK_INDEX[r2] * 4 + _SUIT_INDEX[s2]
+        if c1 == c2:
+            raise ValueError(f"Combo invalide : {element!r}")
+        return [COMBO_INDEX[c1, c2]]
+
+    if '-' in element:
+        first, last = (_parse_hand(part) for part in element.split('-', 1))
+        if first[3] or last[3] or first[2] != last[2]:
+            raise ValueError(f"Intervalle de range invalide : {element!r}")
+        (h1, l1, kind, _), (h2, l2, _, _) = first, last
+        if h1 == l1 and h2 == l2:  # Paires : TT-77
+            hands = [(r, r) for r in range(min(h1, h2), max(h1, h2) + 1)]
+        elif h1 == h2:  # Même carte haute : A5s-A2s
+            hands = [(h1, r) for r in range(min(l1, l2), max(l1, l2) + 1)]
+        elif h1 - l1 == h2 - l2:  # Connecteurs : 76s-54s
+            hands = [(h, h - (h1 - l1)) for h in range(min(h1, h2), max(h1, h2) + 1)]
+        else:
+            raise ValueError(f"Intervalle de range invalide : {element!r}")
+        return [i for high, low in hands for i in _hand_combos(high, low, kind)]
+
+    high, low, kind, plus = _parse_hand(element)
+    if not plus:
+        return _hand_combos(high, low, kind)
+    if high == low:  # TT+
+        return [i for r in range(high, 13) for i in _hand_combos(r, r, '')]
+    return [i for r in range(low, high) for i in _hand_combos(high, r, kind)]  # AQs+
+
+
+@lru_cache(maxsize=None)
+def _compile(notation):
+    weights = np.zeros(NUM_COMBOS)
+    for element in filter(None, notation.split(',')):
+        element, _, weight = element.partition(':')
+        weights[_element_combos(element)] = float(weight) if weight else 1.0
+    weights.flags.writeable = False
+    bits = 0
+    for i in np.flatnonzero(weights).tolist():
+        bits |= 1 << i
+    return weights, bits
+
+
+def _normalize(notation):
+    return ','.join(part.strip() for part in notation.replace(' ', '').split(',') if part.strip())
+
+
+def compile_range(notation):
+    """
+    Compile une notation de range en (poids (1326,) en lecture seule, masque de bits des combos présents).
+    Le résultat est mémoïsé : une même notation n'est analysée qu'une fois par processus.
+    """
+    return _compile(_normalize(notation))
+
+
+def range_weights(notation, dead_mask=0):
+    """
+    Poids (copie modifiable) d'une notation de range, combos bloqués par les cartes mortes retirés
+    en une seule opération vectorielle.
+    arg: dead_mask --> Masque de bits des cartes mortes (board, main du héros).
+    """
+    weights, _ = compile_range(notation)
+    return np.where(dead_combos(dead_mask), 0.0, weights)
+
+
+class Range:
+    """
+    Range pondérée d'un joueur sur les 1326 combos.
+    """
+    def __init__(self, weights=None):
+        """
+        arg: weights --> Poids des 1326 combos (None = range complète, tous les combos à 1).
+        """
+        if weights is None:
+            weights = np.ones(NUM_COMBOS)
+        self.weights = np.array(weights, dtype=np.float64)
+
+    @classmethod
+    def from_notation(cls, notation, dead_mask=0):
+        """
+        Range depuis une notation, ex. Range.from_notation("TT+, AQs+, KJo, 76s-54s").
+        """
+        return cls(range_weights(notation, dead_mask))
+
+    def copy(self):
+        return Range(self.weights.copy())
+
+    def remove_dead(self, dead_mask):
+        """
+        Met à zéro les combos contenant une carte morte (main du héros, board).
+        """
+        self.weights[dead_combos(dead_mask)] = 0.0
+        return self
+
+    def narrow(self, percentile, keep_from, keep_to, outside_weight=0.0):
+        """
+        Réduit la range selon le percentile de force de chaque combo (0 = plus faible, 1 = plus fort).
+        Les combos dont le percentile est dans [keep_from, keep_to] gardent leur poids, les autres sont multipliés par outside_weight.
+        """
+        inside = (percentile >= keep_from) & (percentile <= keep_to)
+        self.weights *= np.where(inside, 1.0, outside_weight)
+        return self
+
+    def total(self):
+        return float(self.weights.sum())
+
+    def is_full(self):
+        return bool(np.all(self.weights == 1.0))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.weights))
+
+
+def runouts(board, dead_mask, max_runouts=300, rng=None):
+    """
+    Runouts possibles (tableau (R, 5 - len(board))) : énumération complète si leur nombre est <= max_runouts,
+    sinon max_runouts runouts tirés aléatoirement.
+    """
+    cards_needed = 5 - len(board)
+    live = available_cards(dead_mask)
+    count = comb(live.size, cards_needed)
+    if count <= max_runouts:
+        return np.array(list(combinations(live.tolist(), cards_needed)), dtype=np.int64).reshape(count, cards_needed)
+    return CardSampler(generator=rng).sample_batch(live, max_runouts, cards_needed).copy()
+
+
+def combo_strengths(board, runout_cards):
+    """
+    Forces des 1326 combos pour chaque board complet (board + runout), calculées en un seul appel à evaluate_batch.
+    Les combos en conflit avec le board complet valent -1.
+    return: Tableau (R, 1326).
+    """
+    num_runouts = len(runout_cards)
+    full_board = np.empty((num_runouts, 5), dtype=np.int64)
+    full_board[:, :len(board)] = board
+    full_board[:, len(board):] = runout_cards
+
+    # Seuls les combos sans carte commune avec le board complet sont évalués
+    board_masks = np.left_shift(np.uint64(1), full_board.astype(np.uint64)).sum(axis=1, dtype=np.uint64)
+    runout_idx, combo_idx = np.nonzero((COMBO_MASKS[None, :] & board_masks[:, None]) == 0)
+
+    strengths = np.full((num_runouts, NUM_COMBOS), -1, dtype=np.int64)
+    strengths[runout_idx, combo_idx] = evaluate_batch(np.hstack((COMBOS[combo_idx], full_board[runout_idx])))
+    return strengths
+
+
+def hero_vs_range_equity(hero, villain_range, board, max_runouts=300, rng=None):
+    """
+    Équité d'une main contre une range pondérée : pour chaque runout, la force du héros est comparée
+    aux forces précalculées des 1326 combos puis pondérée par la range (produit matrice-vecteur).
+    arg: hero --> Main du héros (entiers ou tuples).
+    arg: villain_range --> Range adverse (Range).
+    arg: board --> Board actuel (entiers ou tuples).
+    return: Équité (float entre 0 et 1).
+    """
+    hero, board = to_ints(hero), to_ints(board)
+    dead_mask = cards_mask(hero + board)
+    runout_cards = runouts(board, dead_mask, max_runouts, rng)
+    strengths = combo_strengths(board, runout_cards)
+
+    full_board = np.hstack((np.broadcast_to(board, (len(runout_cards), len(board))), runout_cards)).astype(np.int64)
+    hero_strength = evaluate_batch(np.hstack((np.broadcast_to(hero, (len(runout_cards), 2)), full_board)))
+
+    weights = np.where(dead_combos(dead_mask), 0.0, villain_range.weights)[None, :] * (strengths >= 0)
+    scores = (hero_strength[:, None] > strengths) + 0.5 * (hero_strength[:, None] == strengths)
+    total = weights.sum()
+    return float((scores * weights).sum() / total) if total > 0 else 0.5
+
+
+def range_vs_range_equity(hero_range, villain_range, board, max_runouts=50, rng=None):
+    """
+    Équité d'une range contre une autre : pour chaque runout, matrice de résultats (1326 x 1326) entre combos,
+    masquée par la compatibilité des cartes et réduite par w1^T M w2.
+    arg: hero_range, villain_range --> Ranges (Range).
+    arg: board --> Board actuel (entiers ou tuples).
+    return: Équité de hero_range (float entre 0 et 1).
+    """
+    board = to_ints(board)
+    dead_mask = cards_mask(board)
+    runout_cards = runouts(board, dead_mask, max_runouts, rng)
+    strengths = combo_strengths(board, runout_cards)
+    compatible = combo_compatibility()
+
+    won = 0.0
+    total = 0.0
+    for s in strengths:
+        valid = s >= 0
+        w1 = hero_range.weights * valid
+        w2 = villain_range.weights * valid
+        scores = (np.sign(s[:, None] - s[None, :]) + 1.0) * 0.5 * compatible
+        won += w1 @ scores @ w2
+        total += w1 @ compatible @ w2
+    return float(won / total) if total > 0 else 0.5
@@ -0,0 +1,273 @@
+import json
+import os
+import numpy as np
+from pathlib import Path
+from history import GameHistory
+
+"""
+Stockage binaire columnaire d'une série de simulations (tournois), relu sans copie par np.memmap.
+Un répertoire contient :
+- stacks.i32 : stacks de tous les joueurs après chaque main, tournois concaténés (int32, (mains, joueurs))
+- game_numbers.i32 : numéro de chaque main (int32)
+- index.npz : par tournoi, indice de simulation, bornes [offsets[i], offsets[i + 1]) dans les colonnes,
+  stacks finaux, victoires et nombre de mains
+- meta.json : noms des joueurs et nombre de lignes valides
+Les colonnes sont écrites en ajout ; index.npz et meta.json sont réécrits de façon atomique à chaque flush.
+"""
+STACKS_FILE = "stacks.i32"
+GAME_NUMBERS_FILE = "game_numbers.i32"
+INDEX_FILE = "index.npz"
+META_FILE = "meta.json"
+
+
+def _atomic_write(path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def summarize(results, player_names):
+    """
+    Résumé compact d'un tournoi (Game.simulation) : ce que les agrégats et graphiques utilisent,
+    sans board ni dicts par main.
+    arg: results --> Résultat de Game.simulation (player_stats et game_history).
+    arg: player_names --> Ordre des joueurs dans les colonnes.
+    return: dict player_names, total_games, final_stacks, wins (listes par joueur),
+            game_numbers (int32), stacks (int32, (mains, joueurs)).
+    """
+    history = results.get('game_history', [])
+    if not isinstance(history, GameHistory):
+        rows = history
+        history = GameHistory(player_names, capacity=max(1, len(rows)))
+        for record in rows:
+            history.append_record(record)
+
+    count = len(history)
+    player_stats = results['player_stats']
+    return {
+        'player_names': list(player_names),
+        'total_games': results.get('total_games', count),
+        'final_stacks': [player_stats[n]['final_stack'] for n in player_names],
+        'wins': [player_stats[n]['wins'] for n in player_names],
+        'game_numbers': np.ascontiguousarray(history.game_number[:count], dtype=np.int32),
+        'stacks': np.ascontiguousarray(history.stacks[:count][:, [history.player_names.index(n) for n in player_names]],
+                                       dtype=np.int32),
+    }
+
+
+class ResultStore:
+    """
+    Résultats d'une série de simulations : ajout tournoi par tournoi (add), lecture par memory-map.
+    """
+    def __init__(self, directory, player_names=None, overwrite=False):
+        """
+        arg: directory --> Répertoire du stockage (créé si besoin).
+        arg: player_names --> Noms des joueurs (obligatoire pour un nouveau stockage, relu depuis meta.json sinon).
+        arg: overwrite --> Effacer un stockage existant au lieu de le compléter.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if overwrite:
+            for name in (STACKS_FILE, GAME_NUMBERS_FILE, INDEX_FILE, META_FILE):
+                (self.directory / name).unlink(missing_ok=True)
+
+        meta_path = self.directory / META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            self.player_names = meta['player_names']
+            self.num_rows = meta['num_rows']
+            index = np.load(self.directory / INDEX_FILE)
+            self.sim_indices = index['sim_indices'].tolist()
+            self.offsets = index['offsets'].tolist()
+            self._final_stacks = index['final_stacks'].tolist()
+            self._wins = index['wins'].tolist()
+        else:
+            if player_names is None:
+                raise ValueError(f"Aucun stockage dans {self.directory} : player_names est requis pour le créer")
+            self.player_names = list(player_names)
+            self.num_rows = 0
+            self.sim_indices, self.offsets, self._final_stacks, self._wins = [], [0], [], []
+
+        # Des lignes écrites après le dernier flush (arrêt brutal) sont ignorées puis écrasées
+        for name, width in ((STACKS_FILE, len(self.player_names)), (GAME_NUMBERS_FILE, 1)):
+            path = self.directory / name
+            with open(path, 'ab') as f:
+                f.truncate(self.num_rows * width * 4)
+        self._stacks_map = None
+        self._game_numbers_map = None
+
+    def __len__(self):
+        return len(self.sim_indices)
+
+    def __contains__(self, sim_index):
+        return sim_index in set(self.sim_indices)
+
+    def add(self, sim_index, results):
+        """
+        Ajoute un tournoi terminé.
+        arg: sim_index --> Numéro de la simulation.
+        arg: results --> Résumé (summarize) ou résultat complet de Game.simulation.
+        """
+        summary = results if 'stacks' in results else summarize(results, self.player_names)
+        with open(self.directory / STACKS_FILE, 'ab') as f:
+            f.write(summary['stacks'].tobytes())
+        with open(self.directory / GAME_NUMBERS_FILE, 'ab') as f:
+            f.write(summary['game_numbers'].tobytes())
+
+        self.num_rows += len(summary['game_numbers'])
+        self.sim_indices.append(sim_index)
+        self.offsets.append(self.num_rows)
+        self._final_stacks.append(list(summary['final_stacks']))
+        self._wins.append(list(summary['wins']))
+        self._stacks_map = self._game_numbers_map = None
+
+    def flush(self):
+        """
+        Écrit l'index et les métadonnées : les tournois ajoutés jusqu'ici deviennent visibles à la relecture.
+        """
+        num_players = len(self.player_names)
+        index = {
+            'sim_indices': np.array(self.sim_indices, dtype=np.int64),
+            'offsets': np.array(self.offsets, dtype=np.int64),
+            'final_stacks': np.array(self._final_stacks, dtype=np.float64).reshape(-1, num_players),
+            'wins': np.array(self._wins, dtype=np.int64).reshape(-1, num_players),
+        }
+        _atomic_write(self.directory / INDEX_FILE, lambda f: np.savez(f, **index))
+        meta = {'player_names': self.player_names, 'num_rows': self.num_rows}
+        _atomic_write(self.directory / META_FILE, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def stacks(self):
+        """
+        Stacks de toutes les mains de tous les tournois, memory-map en lecture seule (mains, joueurs).
+        """
+        if self._stacks_map is None:
+            self._stacks_map = self._memmap(STACKS_FILE, (self.num_rows, len(self.player_names)))
+        return self._stacks_map
+
+    @property
+    def game_numbers(self):
+        if self._game_numbers_map is None:
+            self._game_numbers_map = self._memmap(GAME_NUMBERS_FILE, (self.num_rows,))
+        return self._game_numbers_map
+
+    def _memmap(self, name, shape):
+        if self.num_rows == 0:
+            return np.zeros(shape, dtype=np.int32)
+        return np.memmap(self.directory / name, dtype=np.int32, mode='r', shape=shape)
+
+    @property
+    def final_stacks(self):
+        return np.array(self._final_stacks, dtype=np.float64).reshape(-1, len(self.player_names))
+
+    @property
+    def wins(self):
+        return np.array(self._wins, dtype=np.int64).reshape(-1, len(self.player_names))
+
+    @property
+    def total_games(self):
+        return np.diff(self.offsets)
+
+    def trajectory(self, i):
+        """
+        Numéros de main et stacks (vues sur le memory-map) du i-ème tournoi stocké.
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.game_numbers[start:end], self.stacks[start:end]
+
+    def trajectories(self):
+        for i in range(len(self)):
+            yield self.trajectory(i)
+
+
+MANIFEST_FILE = "manifest.json"
+
+
+class CheckpointShards:
+    """
+    Points de reprise d'une série de simulations : chaque paquet de tournois terminés est écrit dans son propre
+    fichier shard_NNNNN.npz (résumés compacts, sans historique complet) et listé dans manifest.json.
+    Une relance avec la même configuration ne recalcule que les tournois absents (voir completed).
+    """
+    def __init__(self, directory, config, overwrite=False):
+        """
+        arg: directory --> Répertoire des points de reprise (créé si besoin).
+        arg: config --> Paramètres de la série (dict sérialisable en JSON, ex. stack initial, graine, joueurs).
+                        Une reprise avec une configuration différente est refusée.
+        arg: overwrite --> Effacer les points de reprise existants au lieu de les reprendre.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.config = config
+        if overwrite:
+            for path in self.directory.glob("shard_*.npz"):
+                path.unlink()
+            (self.directory / MANIFEST_FILE).unlink(missing_ok=True)
+
+        manifest_path = self.directory / MANIFEST_FILE
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+            if manifest['config'] != config:
+                raise ValueError(f"Les points de reprise de {self.directory} ont une autre configuration "
+                                 f"({manifest['config']} au lieu de {config}) : changez de répertoire ou supprimez-le")
+            self.shards = manifest['shards']
+        else:
+            self.shards = []
+        self.completed = {sim_num for shard in self.shards for sim_num in shard['sim_indices']}
+
+    def write_shard(self, items):
+        """
+        Enregistre un paquet de tournois terminés puis met à jour le manifeste (écritures atomiques).
+        arg: items --> Liste de couples (numéro de simulation, résumé de summarize).
+        """
+        if not items:
+            return
+        name = f"shard_{len(self.shards):05d}.npz"
+        summaries = [summary for _, summary in items]
+        shard = {
+            'sim_indices': np.array([sim_num for sim_num, _ in items], dtype=np.int64),
+            'offsets': np.cumsum([0] + [len(s['game_numbers']) for s in summaries]).astype(np.int64),
+            'total_games': np.array([s['total_games'] for s in summaries], dtype=np.int64),
+            'final_stacks': np.array([s['final_stacks'] for s in summaries], dtype=np.float64),
+            'wins': np.array([s['wins'] for s in summaries], dtype=np.int64),
+            'game_numbers': np.concatenate([s['game_numbers'] for s in summaries]).astype(np.int32),
+            'stacks': np.concatenate([s['stacks'] for s in summaries]).astype(np.int32),
+        }
+        _atomic_write(self.directory / name, lambda f: np.savez(f, **shard))
+
+        self.shards.append({'file': name, 'sim_indices': shard['sim_indices'].tolist()})
+        self.completed.update(shard['sim_indices'].tolist())
+        manifest = {'config': self.config, 'shards': self.shards}
+        _atomic_write(self.directory / MANIFEST_FILE,
+                      lambda f: f.write(json.dumps(manifest, indent=1).encode('utf-8')))
+
+    def summaries(self):
+        """
+        Relit les tournois déjà enregistrés, shard par shard.
+        Génère des couples (numéro de simulation, résumé) au format de summarize.
+        """
+        player_names = self.config['player_names']
+        for shard in self.shards:
+            with np.load(self.directory / shard['file']) as npz:
+                data = {key: npz[key] for key in npz.files}  # chaque accès à npz relit le fichier
+            offsets = data['offsets']
+            for i, sim_num in enumerate(data['sim_indices'].tolist()):
+                start, end = offsets[i], offsets[i + 1]
+                yield sim_num, {
+                    'player_names': player_names,
+                    'total_games': int(data['total_games'][i]),
+                    'final_stacks': data['final_stacks'][i].tolist(),
+                    'wins': data['wins'][i].tolist(),
+                    'game_numbers': data['game_numbers'][start:end],
+                    'stacks': data['stacks'][start:end],
+                }
@@ -1,15 +1,392 @@
 import random
 import json
-from deal import Deal
-from utils import hand_rank
+import numpy as np
+from math import comb
+from itertools import combinations, permutations
+from collections import OrderedDict
+from pathlib import Path
+from utils import evaluate, evaluate_batch, strength_category, to_ints, ints_to_cards, cards_mask, available_cards
+from ranges import Range, COMBOS, hero_vs_range_equity, runouts as board_runouts
+from deal import CardSampler
 from collections import Counter
 
+_sampler = CardSampler()
+
+
+def batch_scores(hero, board, available, num_simulations, num_opponents=1):
+    """
+    Monte Carlo vectorisé : tire en un seul tableau les mains adverses et les runouts de toutes les simulations,
+    évalue tout par lots et retourne le score de chaque simulation avec des opérations sur tableaux.
+    arg: hero --> Main du joueur (entiers 0-51).
+    arg: board --> Board actuel (entiers 0-51).
+    arg: available --> Cartes inconnues (entiers 0-51).
+    arg: num_simulations --> Nombre de simulations.
+    arg: num_opponents --> Nombre de mains adverses aléatoires par simulation.
+    return: Tableau (num_simulations,) : 1 si victoire, 0 si défaite, 1/n pour une égalité à n joueurs.
+    """
+    available = np.asarray(available, dtype=np.int64)
+    cards_needed = 5 - len(board)
+    opp_cards = 2 * num_opponents
+    k = opp_cards + cards_needed
+
+    # Tirage sans remise de k cartes par simulation (Fisher-Yates partiel sur un tampon préalloué)
+    draws = _sampler.sample_batch(available, num_simulations, k)
+
+    full_board = np.empty((num_simulations, 5), dtype=np.int64)
+    full_board[:, :len(board)] = board
+    full_board[:, len(board):] = draws[:, opp_cards:]
+
+    hero_strength = evaluate_batch(np.hstack((np.broadcast_to(hero, (num_simulations, 2)), full_board)))
+
+    # Toutes les mains adverses de toutes les simulations sont évaluées en un seul appel
+    opp_hands = draws[:, :opp_cards].reshape(num_simulations * num_opponents, 2)
+    opp_boards = np.repeat(full_board, num_opponents, axis=0)
+    villain_strength = evaluate_batch(np.hstack((opp_hands, opp_boards))).reshape(num_simulations, num_opponents)
+    best_villain = villain_strength.max(axis=1)
+
+    scores = (hero_strength > best_villain).astype(np.float64)
+    tied = hero_strength == best_villain
+    scores[tied] = 1 / (1 + np.count_nonzero(villain_strength[tied] == best_villain[tied, None], axis=1))
+    return scores
+
+
+def batch_equity(hero, board, available, num_simulations, num_opponents=1):
+    """
+    Équité Monte Carlo vectorisée (moyenne des scores de batch_scores).
+    return: Équité (float entre 0 et 1), une égalité à n joueurs compte pour 1/n.
+    """
+    return float(batch_scores(hero, board, available, num_simulations, num_opponents).mean())
+
+
+def adaptive_equity(hero, board, available, max_trials, target_se=None, thresholds=None,
+                    num_opponents=1, batch_size=250, z=1.96):
+    """
+    Monte Carlo adaptatif : simule par lots et s'arrête dès que l'erreur standard atteint target_se,
+    ou dès qu'aucun seuil de décision n'est dans l'intervalle de confiance (la décision ne peut plus changer).
+    arg: max_trials --> Budget maximal de simulations.
+    arg: target_se --> Erreur standard visée (None = pas d'arrêt sur la précision).
+    arg: thresholds --> Seuils d'équité qui changent la décision (None = pas d'arrêt sur la décision).
+    arg: z --> Quantile de l'intervalle de confiance (1.96 --> 95%).
+    return: (équité, nombre de simulations réellement utilisées).
+    """
+    total = 0.0
+    total_sq = 0.0
+    trials = 0
+    while trials < max_trials:
+        scores = batch_scores(hero, board, available, min(batch_size, max_trials - trials), num_opponents)
+        total += scores.sum()
+        total_sq += np.square(scores).sum()
+        trials += scores.size
+
+        equity = total / trials
+        se = np.sqrt(max(total_sq / trials - equity ** 2, 0.0) / trials)
+        if target_se is not None and se <= target_se:
+            break
+        if thresholds and all(abs(equity - t) > z * se for t in thresholds):
+            break
+    return total / trials, trials
+
+
+def estimate_suffices(equity, trials, num_simulations, target_se=None, thresholds=None, z=1.96):
+    """
+    Une estimation Monte Carlo déjà faite (equity sur trials simulations) suffit-elle pour une nouvelle décision ?
+    Oui si elle a au moins num_simulations simulations, si son erreur standard (majorant, voir
+    EquityCache.standard_error) atteint target_se, ou si aucun seuil de décision n'est dans son intervalle de confiance.
+    arg: trials --> Simulations de l'estimation (None = équité exacte ou table préflop : suffit toujours).
+    """
+    if trials is None or trials >= num_simulations:
+        return True
+    se = EquityCache.standard_error(equity, trials)
+    if target_se is not None and se <= target_se:
+        return True
+    return bool(thresholds) and all(abs(equity - t) > z * se for t in thresholds)
+
+
+EQUITY_MODES = ("auto", "mc", "exact")
+EXACT_THRESHOLD = 50_000  # Nombre max de combinaisons (runouts x mains adverses) pour l'énumération en mode "auto"
+EXACT_MAX_COMBINATIONS = 1_100_000  # Limite dure de l'énumération (flop en tête-à-tête : 1 070 190), au-delà Monte Carlo
+
+
+def combination_count(num_available, num_board, num_opponents=1):
+    """
+    Nombre de combinaisons (runout, mains adverses ordonnées) à énumérer pour une équité exacte.
+    """
+    cards_needed = 5 - num_board
+    count = comb(num_available, cards_needed)
+    for i in range(num_opponents):
+        count *= comb(num_available - cards_needed - 2 * i, 2)
+    return count
+
+
+def exact_equity(hero, board, available):
+    """
+    Équité exacte en tête-à-tête par énumération de tous les runouts et de toutes les mains adverses.
+    Les paires (runout, main adverse) sont construites sur une grille et filtrées par masque de bits,
+    puis évaluées en un seul appel à evaluate_batch.
+    arg: hero --> Main du joueur (entiers 0-51).
+    arg: board --> Board actuel (entiers 0-51).
+    arg: available --> Cartes inconnues (entiers 0-51).
+    return: Équité (float entre 0 et 1).
+    """
+    available = np.asarray(available, dtype=np.int64)
+    cards_needed = 5 - len(board)
+    bits = np.left_shift(1, np.arange(available.size, dtype=np.int64))
+
+    runouts = np.array(list(combinations(range(available.size), cards_needed)), dtype=np.int64).reshape(comb(available.size, cards_needed), cards_needed)
+    pairs = np.array(list(combinations(range(available.size), 2)), dtype=np.int64)
+    runout_masks = bits[runouts].sum(axis=1)
+    pair_masks = bits[pairs].sum(axis=1)
+    runout_idx, pair_idx = np.nonzero((runout_masks[:, None] & pair_masks[None, :]) == 0)
+
+    full_board = np.empty((len(runouts), 5), dtype=np.int64)
+    full_board[:, :len(board)] = board
+    full_board[:, len(board):] = available[runouts]
+
+    hero_strength = evaluate_batch(np.hstack((np.broadcast_to(hero, (len(runouts), 2)), full_board)))[runout_idx]
+    villain_strength = evaluate_batch(np.hstack((available[pairs[pair_idx]], full_board[runout_idx])))
+
+    win = np.count_nonzero(hero_strength > villain_strength)
+    tie = np.count_nonzero(hero_strength == villain_strength)
+    return (win + tie / 2) / len(runout_idx)
+
+
+ALLIN_MAX_RUNOUTS = 20_000  # Au-delà, les runouts d'un tapis sont échantillonnés plutôt qu'énumérés
+
+
+def allin_equities(hands, board, max_runouts=ALLIN_MAX_RUNOUTS):
+    """
+    Part du pot revenant à chaque main quand plus aucune décision n'est possible (tapis).
+    Tous les runouts sont énumérés si leur nombre est <= max_runouts, sinon max_runouts runouts sont tirés ;
+    une égalité partage la part entre les mains concernées.
+    arg: hands --> Mains des joueurs encore en jeu (entiers 0-51 ou tuples).
+    arg: board --> Board actuel (entiers 0-51 ou tuples).
+    return: Tableau (len(hands),) de parts dont la somme vaut 1.
+    """
+    hands = [to_ints(hand) for hand in hands]
+    board = to_ints(board)
+    dead_mask = cards_mask(board + [card for hand in hands for card in hand])
+    runout_cards = board_runouts(board, dead_mask, max_runouts)
+
+    num_runouts = len(runout_cards)
+    full_board = np.hstack((np.broadcast_to(np.asarray(board, dtype=np.int64), (num_runouts, len(board))), runout_cards))
+    strengths = np.stack([evaluate_batch(np.hstack((np.broadcast_to(hand, (num_runouts, 2)), full_board)))
+                          for hand in hands], axis=1)
+    winners = strengths == strengths.max(axis=1, keepdims=True)
+    return (winners / winners.sum(axis=1, keepdims=True)).mean(axis=0)
+
+
+_SUIT_PERMUTATIONS = list(permutations(range(4)))
+
+
+def canonical_key(hand, board, num_opponents=1):
+    """
+    Clé isomorphe par couleur de (main, board, adversaires) : les 24 permutations de couleurs sont appliquées
+    et la plus petite forme triée est retenue, ex. AhKh sur Qh7c2d et AsKs sur Qs7d2c donnent la même clé.
+    arg: hand, board --> Cartes au format entier (0-51).
+    """
+    return min(
+        (tuple(sorted((c & ~3) | perm[c & 3] for c in hand)),
+         tuple(sorted((c & ~3) | perm[c & 3] for c in board)))
+        for perm in _SUIT_PERMUTATIONS
+    ) + (num_opponents,)
+
+
+class EquityCache:
+    """
+    Cache LRU borné des équités, partagé par toutes les instances de Stat du processus.
+    Chaque entrée garde sa précision : nombre de simulations Monte Carlo, ou None pour une équité exacte.
+    Une entrée n'est servie qu'à un appelant qui ne demande pas plus de précision qu'elle n'en a
+    (une estimation arrêtée tôt par adaptive_equity a peu de simulations et ne sert donc qu'aux petits budgets,
+    ou aux appelants dont l'erreur standard visée est atteinte).
+    """
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    @staticmethod
+    def _covers(trials, min_trials):
+        # Une équité exacte convient à tout appelant, une estimation seulement si elle a assez de simulations
+        return trials is None or (min_trials is not None and trials >= min_trials)
+
+    @staticmethod
+    def standard_error(equity, trials):
+        """
+        Majorant de l'erreur standard d'une estimation : les scores étant dans [0, 1], leur variance est <= p(1 - p).
+        """
+        return 0.0 if trials is None else np.sqrt(equity * (1 - equity) / trials)
+
+    def get(self, key, min_trials=None, max_se=None):
+        """
+        Retourne l'équité en cache (et la marque comme récente) ou None (voir get_entry).
+        """
+        entry = self.get_entry(key, min_trials, max_se)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key, min_trials=None, max_se=None):
+        """
+        Retourne l'entrée en cache (équité, simulations) et la marque comme récente, ou None.
+        arg: min_trials --> Nombre minimal de simulations d'une estimation acceptée (None = équité exacte exigée).
+        arg: max_se --> Erreur standard visée : une estimation dont le majorant d'erreur standard est
+                        inférieur est aussi acceptée (None = critère non utilisé).
+        """
+        entry = self._data.get(key)
+        precise_enough = entry is not None and min_trials is not None and max_se is not None \
+            and self.standard_error(*entry) <= max_se
+        if entry is None or not (self._covers(entry[1], min_trials) or precise_enough):
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, equity, trials=None):
+        """
+        Enregistre une équité. arg: trials --> Simulations de l'estimation (None = équité exacte).
+        Une entrée plus précise déjà présente est conservée.
+        """
+        entry = self._data.get(key)
+        if entry is None or not self._covers(entry[1], trials):
+            self._data[key] = (equity, trials)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self, reset_stats=True):
+        """
+        Vide le cache. arg: reset_stats --> Remettre aussi hits et misses à zéro.
+        """
+        self._data.clear()
+        if reset_stats:
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Statistiques du cache : hits, misses, taux de hit, taille courante et maximale.
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+
+equity_cache = EquityCache()
+
+
+PREFLOP_EQUITY_PATH = Path(__file__).resolve().parent / "preflop_equity.npy"
+PREFLOP_MAX_OPPONENTS = 5
+_preflop_table = None
+
+
+def preflop_index(hand):
+    """
+    Index (0-168) d'une main de départ canonique dans la grille 13x13 :
+    paires sur la diagonale, suited en [haute, basse], offsuit en [basse, haute].
+    arg: hand --> Deux cartes (entiers 0-51).
+    """
+    r1, r2 = hand[0] >> 2, hand[1] >> 2
+    high, low = max(r1, r2), min(r1, r2)
+    if (hand[0] & 3) == (hand[1] & 3):
+        return high * 13 + low
+    return low * 13 + high
+
+
+def preflop_indices(combos):
+    """
+    Version vectorisée de preflop_index pour un tableau de mains (N, 2).
+    """
+    r1, r2 = combos[:, 0] >> 2, combos[:, 1] >> 2
+    high, low = np.maximum(r1, r2), np.minimum(r1, r2)
+    suited = (combos[:, 0] & 3) == (combos[:, 1] & 3)
+    return np.where(suited, high * 13 + low, low * 13 + high)
+
+
+def load_preflop_table():
+    """
+    Charge (une seule fois par processus) la table d'équité préflop en memory-map.
+    Forme (169, PREFLOP_MAX_OPPONENTS) : équité contre 1 à 5 adversaires aléatoires.
+    Retourne None si le fichier n'a pas été généré (voir generate_preflop_equity.py).
+    """
+    global _preflop_table
+    if _preflop_table is None and PREFLOP_EQUITY_PATH.exists():
+        _preflop_table = np.load(PREFLOP_EQUITY_PATH, mmap_mode='r')
+    return _preflop_table
+
+
+def combo_percentiles(board):
+    """
+    Percentile de force (0 = plus faible, 1 = plus fort) de chacun des 1326 combos sur ce board.
+    Préflop : équité de la table préflop (ou force des deux cartes si la table est absente).
+    Postflop : force de la main faite combo + board.
+    arg: board --> Board (entiers 0-51).
+    """
+    table = load_preflop_table()
+    if not board and table is not None:
+        strength = np.asarray(table[preflop_indices(COMBOS), 0])
+    else:
+        strength = evaluate_batch(np.hstack((COMBOS, np.broadcast_to(board, (len(COMBOS), len(board))))))
+    percentile = np.empty(len(COMBOS))
+    percentile[np.argsort(strength, kind='stable')] = np.arange(len(COMBOS)) / (len(COMBOS) - 1)
+    return percentile
+
+
+class LazyStats:
+    """
+    Statistiques d'une décision calculées à la première lecture puis mémorisées.
+    Une stratégie qui décide sans consulter l'équité (stack vide, check gratuit...) ne paie aucun calcul.
+    """
+    def __init__(self, compute):
+        """
+        arg: compute --> Fonction sans argument renvoyant (équité, choix optimal, montant optimal),
+                         ex. la sortie de Stat.win_chance_and_choice.
+        """
+        self._compute = compute
+        self._result = None
+        self.error = None  # Exception levée par compute, le cas échéant
+
+    @property
+    def computed(self):
+        return self._result is not None
+
+    def _get(self):
+        if self._result is None:
+            try:
+                self._result = self._compute()
+            except Exception as error:
+                self.error = error
+                raise
+        return self._result
+
+    @property
+    def equity(self):
+        return self._get()[0]
+
+    @property
+    def optimal_choice(self):
+        return self._get()[1]
+
+    @property
+    def optimal_bet(self):
+        return self._get()[2]
+
+
 class Stat:
-    def __init__(self, hand, board, pot, amount_to_call, players=None, main_character=None, stage=0, position_main_character=None):
+    def __init__(self, hand, board, pot, amount_to_call, players=None, main_character=None, stage=0, position_main_character=None,
+                 equity_mode="auto", exact_threshold=EXACT_THRESHOLD, target_se=None, num_opponents=1, opponent_range=None,
+                 equity=None, equity_trials=None):
         """
         Récupère les données pour les calculs statistiques du poker sur les class Deal, Player, Game.
-        arg: hand --> Main du joueur principal (ex. [('H', 'A'), ('D', 'K')]).
-        arg: board --> Liste des cartes du board, ex. [('H', 'A'), ('D', 'K')].
+        arg: hand --> Main du joueur principal (entiers 0-51 ou ex. [('H', 'A'), ('D', 'K')]).
+        arg: board --> Liste des cartes du board (entiers 0-51 ou ex. [('H', 'A'), ('D', 'K')]).
         arg: pot --> Taille du pot (issu de la classe Dealer).
         arg: amount_to_call --> Montant à payer pour suivre.
         arg: players --> Liste des joueurs (objets Player) - optionnel.
@@ -17,6 +394,14 @@ class Stat:
         arg: stage --> Étape de la partie (0=preflop, 1=flop, 2=turn, 3=river).
         arg: position_main_character --> Position du joueur principal (ex. 'BTN', 'SB').
         arg: opponent_stats --> Statistiques adverses pour les calculs (VPIP, PFR, AF).
+        arg: equity_mode --> Mode de calcul de l'équité par défaut ("auto", "mc" ou "exact").
+        arg: exact_threshold --> Nombre max de combinaisons pour passer en énumération exacte en mode "auto".
+        arg: target_se --> Erreur standard visée par win_chance_and_choice (Monte Carlo adaptatif).
+        arg: num_opponents --> Nombre d'adversaires encore en jeu (mains aléatoires distribuées à chaque simulation).
+        arg: opponent_range --> Range adverse (ranges.Range ou notation ex. "TT+, AQs+") - optionnel, réduite par apply_action.
+        arg: equity --> Équité déjà connue pour cette main et ce board (ex. mémo de Game) - optionnel, évite le recalcul
+                        si elle est assez précise pour la décision (voir estimate_suffices).
+        arg: equity_trials --> Simulations de l'estimation equity (None = exacte ou table préflop, toujours réutilisée).
         """
         self.hand = hand
         self.board = board 
@@ -26,19 +411,32 @@ class Stat:
         self.main_character = main_character
         self.stage = stage
         self.position_main_character = position_main_character
+        self.equity_mode = equity_mode
+        self.exact_threshold = exact_threshold
+        self.target_se = target_se
+        self.num_opponents = max(1, num_opponents)
         
-        # Initialisation de opp_hand avec toutes les cartes possibles pour l'adversaire
-        deal = Deal()
-        card_board_now = self.board.copy()
-        known_cards = self.hand + card_board_now
-        self.opp_hand = [card for card in deal.cards_init() if card not in known_cards]  # Toutes les cartes possibles pour l'adversaire ( donc packet - carte du board - main du joueur principal)
+        # Cartes au format entier et masque de bits des cartes mortes (main + board)
+        self.hand_ints = to_ints(self.hand)
+        self.board_ints = to_ints(self.board)
+        self.dead_mask = cards_mask(self.hand_ints + self.board_ints)
+
+        # Range adverse (compilée depuis la notation si besoin, cartes mortes retirées)
+        if isinstance(opponent_range, str):
+            opponent_range = Range.from_notation(opponent_range, self.dead_mask)
+        self.opponent_range = opponent_range
 
         # Cache pour l'équité (évite de recalculer Monte Carlo plusieurs fois)
-        self._equity_cache = None
+        self._equity_cache = equity
+        self._preset_trials = equity_trials if equity is not None else None
+        self.equity_from_preset = equity is not None  # L'équité fournie à la construction a été réutilisée
+        self.equity_trials = equity_trials  # Simulations derrière l'équité courante (None = exacte ou table préflop)
+        self.trials_used = 0  # Simulations Monte Carlo réellement effectuées par le dernier calcul d'équité
+        self.exact_used = False  # Le dernier calcul d'équité était une énumération exacte
+
+        # Table d'équité préflop précalculée (memory-map, None si absente)
+        self.initial_equity = load_preflop_table()
 
-        """with open("preflop_equity.json", "r") as f:
-            self.initial_equity = json.load(f)"""
-        
 
     def pot_odds(self):
         """
@@ -104,9 +502,14 @@ class Stat:
         # Pour l'instant, retourne un prior basé sur MDF
         return 1 - self.MDF()
     
-    def outs(self):
+    def outs(self, against_opponents=False, num_samples=200):
         """
         Calcule le nombre de cartes (outs) améliorant la main du joueur principal.
+        Toutes les cartes candidates sont évaluées en un seul appel à evaluate_batch.
+        arg: against_opponents --> False : une carte est un out si elle améliore la catégorie de notre main.
+                                   True : une carte est un out si elle nous fait passer devant la majorité des mains
+                                   adverses échantillonnées qui nous battent actuellement (forces complètes, kickers compris).
+        arg: num_samples --> Nombre de mains adverses échantillonnées (mode against_opponents).
         Retourne : Nombre d'outs (int) + list des outs (cartes) et probabilité de hit au turn/rive
 
         prob_river = nb_outs/(cards_remaining-1)*100
@@ -115,26 +518,47 @@ class Stat:
         prob_turn_or_river = 1 - ((cards_remaining - nb_outs) / cards_remaining) *
                            ((cards_remaining - nb_outs - 1) / (cards_remaining - 1))
         """
-        outs_list = []
+        # River : plus aucune carte à venir, donc aucun out (les lignes à 8 cartes dépasseraient l'évaluateur)
+        if len(self.board_ints) >= 5:
+            return 0, [], 0.0
 
-        card_board_now = self.board.copy()  # carte du board actuel en copy pour pas sup
-        known_cards = self.hand + card_board_now
-        
-        # Récupération de toutes les cartes depuis Deal
-        deal = Deal()
-        all_cards = deal.cards_init()
-        available_cards = [card for card in all_cards if card not in known_cards]  # cartes disponibles qui sont inconnues (ni board ni hand)
-        value_hand = hand_rank(self.hand, card_board_now)[0]  # valeur actuelle de la main
-
-        for card in available_cards:
-            new_board = card_board_now + [card]  # pour ne pas écraser self.board()
-            new_score = hand_rank(self.hand, new_board)[0]  # recupère le rang de la main avec la nouvelle carte ajoutée au board
-            
-            if new_score > value_hand:
-                outs_list.append(card)
+        known_ints = self.hand_ints + self.board_ints
+        candidates = available_cards(self.dead_mask)  # cartes disponibles qui sont inconnues (ni board ni hand)
+        n = candidates.size
+
+        # Une ligne par carte candidate : main + board + carte
+        with_card = np.empty((n, len(known_ints) + 1), dtype=np.int64)
+        with_card[:, :-1] = known_ints
+        with_card[:, -1] = candidates
+        new_strength = evaluate_batch(with_card)
+
+        if not against_opponents:
+            value_hand = strength_category(evaluate(known_ints))  # valeur actuelle de la main
+            is_out = (new_strength >> 20) > value_hand
+        else:
+            # Échantillon de mains adverses parmi les cartes inconnues
+            opp = _sampler.sample_batch(candidates, num_samples, 2).copy()
+            hero_now = evaluate(known_ints)
+            opp_now = evaluate_batch(np.hstack((opp, np.broadcast_to(self.board_ints, (num_samples, len(self.board_ints))))))
+            behind = opp_now > hero_now
 
+            # Forces adverses pour chaque (carte, main adverse) : board + carte + main adverse
+            board_card = np.empty((n, len(self.board_ints) + 1), dtype=np.int64)
+            board_card[:, :-1] = self.board_ints
+            board_card[:, -1] = candidates
+            opp_after = evaluate_batch(np.hstack((np.repeat(board_card, num_samples, axis=0),
+                                                  np.tile(opp, (n, 1))))).reshape(n, num_samples)
+
+            # Une main adverse contenant la carte candidate n'est pas compatible avec ce runout
+            compatible = (opp[None, :, 0] != candidates[:, None]) & (opp[None, :, 1] != candidates[:, None])
+            losing = compatible & behind[None, :]
+            n_losing = np.count_nonzero(losing, axis=1)
+            overtaken = np.count_nonzero(losing & (new_strength[:, None] > opp_after), axis=1)
+            is_out = (n_losing > 0) & (2 * overtaken > n_losing)
+
+        outs_list = ints_to_cards(candidates[is_out].tolist())
         nb_outs = len(outs_list)
-        cards_remaining = 52 - len(known_cards)  # 2 cartes en main + cartes du board
+        cards_remaining = 52 - len(known_ints)  # 2 cartes en main + cartes du board
 
         # probabilité de toucher au turn ou à la river ou rien si pas de cartes restantes
         if cards_remaining > 0:
@@ -146,64 +570,136 @@ class Stat:
 
         return nb_outs, outs_list, round(prob_turn_or_river, 2)
     
-    def get_equity(self, num_simulations=500):
+    def get_equity(self, num_simulations=500, vectorized=True, mode=None, exact_threshold=None, use_shared_cache=True,
+                   target_se=None, thresholds=None):
         """
         Récupère l'équité (avec cache pour éviter de recalculer).
-        Si l'équité a déjà été calculée, retourne la valeur en cache.
-        Sinon, calcule via Monte Carlo et met en cache.
+        Si l'équité a déjà été calculée, retourne la valeur en cache de l'instance,
+        sinon consulte le cache LRU partagé du processus (equity_cache) avant de calculer :
+        une équité exacte attendue n'est servie que par une entrée exacte, une estimation Monte Carlo
+        par une entrée exacte, d'au moins num_simulations simulations ou dont l'erreur standard atteint target_se.
+        arg: mode --> "auto" : table préflop, puis énumération exacte si le nombre de combinaisons
+                      est sous exact_threshold (tête-à-tête), sinon Monte Carlo.
+                      "mc" : toujours Monte Carlo. "exact" : énumération exacte dès qu'elle est faisable
+                      (tête-à-tête et au plus EXACT_MAX_COMBINATIONS combinaisons), sinon Monte Carlo.
+                      None --> self.equity_mode.
+        arg: exact_threshold --> Seuil du mode "auto" (None --> self.exact_threshold).
+        arg: use_shared_cache --> Utiliser le cache partagé (clé isomorphe par couleur).
+        arg: target_se, thresholds --> Arrêt anticipé du Monte Carlo (voir adaptive_equity),
+                                       num_simulations devient alors le budget maximal.
+        Le nombre de simulations Monte Carlo réellement effectuées est disponible dans self.trials_used
+        (0 pour une énumération exacte, signalée par self.exact_used, ou une valeur en cache).
         """
+        mode = mode or self.equity_mode
+        if mode not in EQUITY_MODES:
+            raise ValueError(f"Mode d'équité inconnu : {mode!r} (attendu : {', '.join(EQUITY_MODES)})")
+        if exact_threshold is None:
+            exact_threshold = self.exact_threshold
+
+        # Une estimation fournie à la construction n'est gardée que si elle suffit pour cette décision
+        if self._preset_trials is not None:
+            if not estimate_suffices(self._equity_cache, self._preset_trials, num_simulations, target_se, thresholds):
+                self._equity_cache = None
+                self.equity_from_preset = False
+            self._preset_trials = None
+
         if self._equity_cache is None:
-            self._equity_cache = self.Monte_Carlo(num_simulations)
+            hero_ints, board_ints, available_ints = self._card_ints()
+            if mode == "auto" and not board_ints and self.initial_equity is not None:
+                # Lecture directe de la table préflop, sans passer par le cache partagé
+                column = min(self.num_opponents, PREFLOP_MAX_OPPONENTS) - 1
+                self._equity_cache = float(self.initial_equity[preflop_index(hero_ints), column])
+                self.trials_used = 0
+                self.equity_trials = None
+                return self._equity_cache
+
+            count = combination_count(len(available_ints), len(board_ints))
+            exact = mode != "mc" and self.num_opponents == 1 and count <= (
+                EXACT_MAX_COMBINATIONS if mode == "exact" else exact_threshold)
+            key = canonical_key(hero_ints, board_ints, self.num_opponents) if use_shared_cache else None
+            if key is not None:
+                entry = equity_cache.get_entry(key, min_trials=None if exact else num_simulations, max_se=target_se)
+                if entry is not None:
+                    self._equity_cache, self.equity_trials = entry
+                    self.trials_used = 0
+                    return self._equity_cache
+
+            if exact:
+                self._equity_cache = exact_equity(hero_ints, board_ints, available_ints)
+                self.trials_used = 0
+                self.exact_used = True
+                self.equity_trials = None
+            else:
+                self._equity_cache = self.Monte_Carlo(num_simulations, vectorized=vectorized,
+                                                      target_se=target_se, thresholds=thresholds)
+                self.equity_trials = self.trials_used
+
+            if key is not None:
+                equity_cache.put(key, self._equity_cache, None if exact else self.trials_used)
         return self._equity_cache
 
-    def Monte_Carlo(self, num_simulations):
+    def _card_ints(self):
+        """
+        Main, board et cartes inconnues au format entier (0-51), les cartes inconnues en tableau NumPy.
+        """
+        return self.hand_ints, self.board_ints, available_cards(self.dead_mask)  # cartes disponibles qui sont inconnues (ni board ni hand)
+
+    def Monte_Carlo(self, num_simulations, vectorized=True, target_se=None, thresholds=None):
         """
         Calcule l'équité via simulation Monte Carlo.
-        arg: num_simulations --> Nombre de simulations à effectuer.
+        arg: num_simulations --> Nombre de simulations à effectuer (budget maximal en mode adaptatif).
+        arg: vectorized --> Mode par lots (batch_equity) ou boucle Python simulation par simulation.
+        arg: target_se, thresholds --> Arrêt anticipé (mode vectorisé uniquement, voir adaptive_equity).
         return: Équité (float entre 0 et 1).
         """
         win = 0
         tie = 0
 
-        card_board_now = self.board.copy()  # carte du board actuel copy pour pas sup primer les cartes du board original
-        known_cards = self.hand + card_board_now
+        hero_ints, board_ints, available_ints = self._card_ints()
+        cards_needed = 5 - len(board_ints)  # nombre de cartes à tirer pour compléter le board
+
+        if vectorized:
+            if target_se is not None or thresholds:
+                equity, self.trials_used = adaptive_equity(hero_ints, board_ints, available_ints, num_simulations,
+                                                           target_se=target_se, thresholds=thresholds,
+                                                           num_opponents=self.num_opponents)
+                return equity
+            self.trials_used = num_simulations
+            return batch_equity(hero_ints, board_ints, available_ints, num_simulations, self.num_opponents)
 
-        # Récupération de toutes les cartes depuis Deal
-        deal = Deal()
-        all_cards = deal.cards_init()
-        available_cards = [card for card in all_cards if card not in known_cards]  # cartes disponibles qui sont inconnues (ni board ni hand)
+        self.trials_used = num_simulations
+        if self.num_opponents > 1:
+            raise ValueError("La boucle Python (vectorized=False) ne gère qu'un seul adversaire")
 
+        available_ints = available_ints.tolist()
         for i in range(num_simulations):
-            sim_available = available_cards.copy()
-            random.shuffle(sim_available)  # mélange les cartes disponibles
-            opp_hand = [sim_available.pop(), sim_available.pop()]  # en perdant deux cartes dans le pack pour simuler une main adverse et on supprime ces cartes du pack
+            drawn = random.sample(available_ints, 2 + cards_needed)  # tire seulement les cartes nécessaires, sans mélanger tout le paquet
+            opp_hand = drawn[:2]  # deux cartes pour simuler une main adverse
 
-            cards_needed = 5 - len(card_board_now)  # nombre de cartes à tirer pour compléter le board
-            final_board = card_board_now + [sim_available.pop() for _ in range(cards_needed)]  # complète le board pour avoir les 5 cartes du board finale 
-                                                                                               # (bien sur en se limitant au nombre de cartes déjà sur le board)
+            final_board = board_ints + drawn[2:]  # complète le board pour avoir les 5 cartes du board finale 
+                                                  # (bien sur en se limitant au nombre de cartes déjà sur le board)
 
-            # en évalue les mains 
-            hero_rank = hand_rank(self.hand, final_board)
-            villain_rank = hand_rank(opp_hand, final_board)
+            # en évalue les mains (forces entières : catégorie puis kickers)
+            hero_strength = evaluate(hero_ints + final_board)
+            villain_strength = evaluate(opp_hand + final_board)
 
             # on compare les résultats
-            test_btw_hands = hero_rank[0]
-            test_btw_opp = villain_rank[0]
-
-            if test_btw_hands > test_btw_opp:
+            if hero_strength > villain_strength:
                 win += 1
-            elif test_btw_hands == test_btw_opp:
+            elif hero_strength == villain_strength:
                 tie += 1
                 
         return (win + tie / 2) / num_simulations  # en retourne l'équité estimée
     
-    def call_equity(self):
+    def call_equity(self, max_runouts=300):
         """
         Équité conditionnelle : seulement les mains qui calleraient.
+        Si la range adverse a été réduite (apply_action), équité contre cette range pondérée,
+        sinon équité standard contre des mains aléatoires.
         """
-        # Pour l'instant, retourne l'équité Monte Carlo standard
-        # À améliorer avec range manager
-        return self.get_equity()
+        if self.opponent_range is None or self.opponent_range.is_full():
+            return self.get_equity()
+        return hero_vs_range_equity(self.hand_ints, self.opponent_range, self.board_ints, max_runouts=max_runouts)
 
     """
     Gère les ranges des joueurs pour les calculs statistiques : stockage et réduction des combos probables.
@@ -212,8 +708,32 @@ class Stat:
     def apply_action(self, action, sizing, board):
         """
         Réduit la range d'un joueur selon son action (bet/call/raise/fold) et le sizing, en fonction du board.
+        Les combos sont classés par percentile de force sur le board (combo_percentiles) :
+        - bet/raise : range polarisée vers le haut, d'autant plus étroite que le sizing est gros.
+        - call : on retire surtout le bas de range (et un peu des mains qui auraient relancé).
+        - check : les mains les plus fortes sont moins probables (elles auraient misé).
+        - fold : la range est vide.
+        arg: sizing --> Montant misé (comparé au pot pour le ratio de sizing).
+        return: La range adverse réduite (self.opponent_range).
         """
-        pass
+        board = to_ints(board)
+        if self.opponent_range is None:
+            self.opponent_range = Range()
+        percentile = combo_percentiles(board)
+        sizing_ratio = (sizing or 0) / max(self.pot, 1)
+
+        if action == 'fold':
+            self.opponent_range.weights[:] = 0.0
+        elif action in ('bet', 'raise'):
+            value_share = min(0.45, max(0.10, 0.45 - 0.20 * sizing_ratio))
+            self.opponent_range.narrow(percentile, 1 - value_share, 1.0, outside_weight=0.08)
+        elif action == 'call':
+            self.opponent_range.narrow(percentile, 0.30, 0.95, outside_weight=0.25)
+        elif action == 'check':
+            self.opponent_range.narrow(percentile, 0.0, 0.85, outside_weight=0.35)
+
+        self.opponent_range.remove_dead(self.dead_mask | cards_mask(board))
+        return self.opponent_range
 
     """
     Enregistre les calculs statistiques (FE, EV, équité) pour audit et analyse.
@@ -228,9 +748,21 @@ class Stat:
         pass
 
 
+    def decision_thresholds(self):
+        """
+        Seuils d'équité auxquels la décision de win_chance_and_choice change de branche.
+        Tant que l'intervalle de confiance de l'équité n'en contient aucun, simuler davantage ne change pas le choix.
+        """
+        if self.amount_to_call == 0:
+            return [0.35, 0.60, 0.80]
+        to_call = self.amount_to_call
+        denominator = self.pot + 2 * to_call
+        # EV_call = equity * (pot + 2 * to_call) - to_call --> seuils EV_call = 0 et EV_call = -to_call / 2
+        return [0.20, 0.30, 0.35, 0.45, 0.52, 0.55, to_call / denominator, 0.5 * to_call / denominator]
+
     def win_chance_and_choice(self, num_simulations=2000):
         # --- Récupération des données ---
-        equity = self.get_equity(num_simulations)
+        equity = self.get_equity(num_simulations, target_se=self.target_se, thresholds=self.decision_thresholds())
         pot_odds = self.pot_odds()
         mdf = self.MDF()
         player_stack = self.main_character.stack if self.main_character else 10000
@@ -1,68 +1,308 @@
-from collections import Counter
+import os
+import numpy as np
+from pathlib import Path
+
+VALUES = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
+COLORS = ['D', 'H', 'S', 'C']
+
+# Catégories de mains (mêmes valeurs que le premier élément renvoyé par hand_rank)
+HIGH_CARD, ONE_PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT, FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH = range(1, 10)
+
+_VALUE_INDEX = {v: i for i, v in enumerate(VALUES)}
+_COLOR_INDEX = {c: i for i, c in enumerate(COLORS)}
+
+
+def card_to_int(card):
+    """
+    Convertit une carte ('H', 'A') en entier 0-51 : rang * 4 + couleur.
+    """
+    return _VALUE_INDEX[card[1]] * 4 + _COLOR_INDEX[card[0]]
+
+
+def int_to_card(code):
+    """
+    Convertit un entier 0-51 en carte ('H', 'A').
+    """
+    return (COLORS[code & 3], VALUES[code >> 2])
+
+
+def cards_to_ints(cards):
+    return [card_to_int(card) for card in cards]
+
+
+def ints_to_cards(codes):
+    return [int_to_card(code) for code in codes]
+
+
+def to_ints(cards):
+    """
+    Normalise une liste de cartes (entiers 0-51 ou ('H', 'A')) en entiers.
+    """
+    return [card_to_int(card) if isinstance(card, (tuple, list)) else int(card) for card in cards]
+
+
+"""
+Ensembles de cartes en masque de bits 64 bits : la carte c correspond au bit 1 << c.
+Union, retrait des cartes mortes et test d'appartenance sont des opérations sur un seul entier.
+"""
+FULL_DECK_MASK = (1 << 52) - 1
+_CARD_BITS = np.left_shift(np.uint64(1), np.arange(52, dtype=np.uint64))
+
+
+def cards_mask(codes):
+    """
+    Masque de bits d'une liste de cartes (entiers 0-51).
+    """
+    mask = 0
+    for code in codes:
+        mask |= 1 << code
+    return mask
+
+
+def mask_to_ints(mask):
+    """
+    Tableau NumPy trié des cartes (entiers 0-51) présentes dans le masque.
+    """
+    return np.flatnonzero(np.uint64(mask) & _CARD_BITS)
+
+
+def available_cards(dead_mask):
+    """
+    Cartes restantes du paquet une fois les cartes mortes retirées (tableau NumPy d'entiers).
+    """
+    return mask_to_ints(FULL_DECK_MASK & ~dead_mask)
+
+
+"""
+Tables de l'évaluateur rapide.
+Une force de main est un entier comparable : catégorie << 20 puis 5 rangs de kickers sur 4 bits chacun.
+- _CARD_KEY[c] : clé additive d'une carte, 5**rang dans les bits hauts (histogramme des rangs en base 5)
+  et un compteur de couleur sur 4 bits dans les 16 bits bas.
+- _FLUSH_SUIT[compteurs de couleurs] : couleur ayant au moins 5 cartes, sinon -1.
+- _FLUSH[masque de rangs] : force d'une couleur ou quinte flush pour un masque 13 bits.
+- _NOFLUSH[histogramme base 5] : force de la main sans couleur (0 à 7 cartes).
+"""
+
+
+def _pack(category, ranks):
+    strength = category
+    for i in range(5):
+        strength = (strength << 4) | (ranks[i] if i < len(ranks) else 0)
+    return strength
+
+
+def _top(mask, n):
+    ranks = []
+    for r in range(12, -1, -1):
+        if len(ranks) == n:
+            break
+        if mask >> r & 1:
+            ranks.append(r)
+    return ranks
+
+
+def _straight_high(mask):
+    for high in range(12, 3, -1):
+        if (mask >> (high - 4)) & 0x1F == 0x1F:
+            return high
+    if mask & 0x100F == 0x100F:  # Roue A-2-3-4-5
+        return 3
+    return -1
+
+
+def _strength_from_counts(counts):
+    mask = 0
+    quads, trips, pairs = [], [], []
+    for r in range(12, -1, -1):
+        c = counts[r]
+        if c:
+            mask |= 1 << r
+        if c == 4:
+            quads.append(r)
+        elif c == 3:
+            trips.append(r)
+        elif c == 2:
+            pairs.append(r)
+
+    if quads:
+        q = quads[0]
+        return _pack(FOUR_OF_A_KIND, [q] + _top(mask & ~(1 << q), 1))
+    if trips and (len(trips) > 1 or pairs):
+        t = trips[0]
+        return _pack(FULL_HOUSE, [t, max(trips[1:] + pairs)])
+    high = _straight_high(mask)
+    if high >= 0:
+        return _pack(STRAIGHT, [high])
+    if trips:
+        t = trips[0]
+        return _pack(THREE_OF_A_KIND, [t] + _top(mask & ~(1 << t), 2))
+    if len(pairs) >= 2:
+        p1, p2 = pairs[0], pairs[1]
+        return _pack(TWO_PAIR, [p1, p2] + _top(mask & ~(1 << p1) & ~(1 << p2), 1))
+    if pairs:
+        p = pairs[0]
+        return _pack(ONE_PAIR, [p] + _top(mask & ~(1 << p), 3))
+    return _pack(HIGH_CARD, _top(mask, 5))
+
+
+def _build_tables():
+    card_key = [(5 ** (c >> 2) << 16) | (1 << 4 * (c & 3)) for c in range(52)]
+
+    flush_suit = [-1] * 65536
+    for packed in range(65536):
+        for suit in range(4):
+            if (packed >> 4 * suit) & 0xF >= 5:
+                flush_suit[packed] = suit
+                break
+
+    flush = [0] * 8192
+    for mask in range(8192):
+        if bin(mask).count("1") >= 5:
+            high = _straight_high(mask)
+            if high >= 0:
+                flush[mask] = _pack(STRAIGHT_FLUSH, [high])
+            else:
+                flush[mask] = _pack(FLUSH, _top(mask, 5))
+
+    noflush = {}
+    counts = [0] * 13
+
+    def fill(rank, remaining, key):
+        if rank < 0:
+            noflush[key] = _strength_from_counts(counts)
+            return
+        for c in range(min(4, remaining) + 1):
+            counts[rank] = c
+            fill(rank - 1, remaining - c, key + c * 5 ** rank)
+        counts[rank] = 0
+
+    fill(12, 7, 0)
+    return card_key, flush_suit, flush, noflush
+
+
+"""
+Tables partagées entre processus (voir engine_pool.publish_tables) : si la variable d'environnement
+SHARED_TABLES_ENV désigne un répertoire publié, les tables NumPy y sont ouvertes en memory-map (lecture seule)
+au lieu d'être recalculées à l'import de chaque processus.
+"""
+SHARED_TABLES_ENV = "POKER_SHARED_TABLES"
+EVALUATOR_TABLES = ('_CARD_KEY_ARR', '_FLUSH_SUIT_ARR', '_FLUSH_ARR', '_NOFLUSH_KEYS', '_NOFLUSH_VALUES')
+
+
+def load_shared_tables(directory):
+    """
+    Tables de l'évaluateur publiées dans directory (fichiers <nom>.npy), ouvertes en memory-map.
+    return: Dict nom --> tableau en lecture seule, ou None si le répertoire est incomplet.
+    """
+    paths = {name: Path(directory) / f"{name}.npy" for name in EVALUATOR_TABLES}
+    if not all(path.exists() for path in paths.values()):
+        return None
+    return {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+
+
+_shared = load_shared_tables(os.environ[SHARED_TABLES_ENV]) if os.environ.get(SHARED_TABLES_ENV) else None
+if _shared is None:
+    _CARD_KEY, _FLUSH_SUIT, _FLUSH, _NOFLUSH = _build_tables()
+
+    # Mêmes tables au format NumPy pour l'évaluation par lots (clés sans couleur triées pour searchsorted)
+    _CARD_KEY_ARR = np.array(_CARD_KEY, dtype=np.int64)
+    _FLUSH_SUIT_ARR = np.array(_FLUSH_SUIT, dtype=np.int8)
+    _FLUSH_ARR = np.array(_FLUSH, dtype=np.int32)
+    _NOFLUSH_KEYS = np.array(sorted(_NOFLUSH), dtype=np.int64)
+    _NOFLUSH_VALUES = np.array([_NOFLUSH[k] for k in _NOFLUSH_KEYS.tolist()], dtype=np.int32)
+else:
+    _CARD_KEY_ARR, _FLUSH_SUIT_ARR, _FLUSH_ARR, _NOFLUSH_KEYS, _NOFLUSH_VALUES = (_shared[name] for name in EVALUATOR_TABLES)
+
+    # Les versions Python de l'évaluateur scalaire se déduisent des tables partagées sans refaire l'énumération
+    # (elles restent propres au processus : ~8 Mo, l'essentiel de la mémoire des tables)
+    _CARD_KEY = _CARD_KEY_ARR.tolist()
+    _FLUSH_SUIT = _FLUSH_SUIT_ARR.tolist()
+    _FLUSH = _FLUSH_ARR.tolist()
+    _NOFLUSH = dict(zip(_NOFLUSH_KEYS.tolist(), _NOFLUSH_VALUES.tolist()))
+
+
+MAX_CARDS = 7  # Mains de 7 cartes au plus (2 en main + 5 au board)
+
+
+def evaluate(cards):
+    """
+    Évaluateur rapide : cards est une liste d'entiers 0-51 (main + board, jusqu'à 7 cartes).
+    Retourne un entier de force comparable directement (catégorie puis kickers).
+    Lève ValueError au-delà de MAX_CARDS cartes (les tables ne couvrent pas ces mains).
+    """
+    if len(cards) > MAX_CARDS:
+        raise ValueError(f"L'évaluateur accepte au plus {MAX_CARDS} cartes ({len(cards)} reçues)")
+    key = sum(map(_CARD_KEY.__getitem__, cards))
+    suit = _FLUSH_SUIT[key & 0xFFFF]
+    if suit < 0:
+        return _NOFLUSH[key >> 16]
+    mask = 0
+    for c in cards:
+        if c & 3 == suit:
+            mask |= 1 << (c >> 2)
+    return _FLUSH[mask]
+
+
+def evaluate_batch(cards):
+    """
+    Évaluateur vectorisé : cards est un tableau d'entiers 0-51 de forme (N, k) avec k <= 7.
+    Retourne un tableau (N,) de forces identiques à celles de evaluate, sans boucle Python sur les mains.
+    Lève ValueError si k > MAX_CARDS (searchsorted renverrait sinon une entrée voisine sans erreur).
+    """
+    cards = np.asarray(cards, dtype=np.intp)
+    if cards.ndim != 2 or cards.shape[1] > MAX_CARDS:
+        raise ValueError(f"evaluate_batch attend un tableau (N, k) avec k <= {MAX_CARDS}, reçu {cards.shape}")
+    keys = _CARD_KEY_ARR[cards].sum(axis=1)
+    suits = _FLUSH_SUIT_ARR[keys & 0xFFFF]
+    strengths = _NOFLUSH_VALUES[np.searchsorted(_NOFLUSH_KEYS, keys >> 16)]
+
+    # Seules les mains avec au moins 5 cartes d'une même couleur passent par la table des couleurs
+    flush_rows = np.flatnonzero(suits >= 0)
+    if flush_rows.size:
+        flush_cards = cards[flush_rows]
+        in_suit = (flush_cards & 3) == suits[flush_rows, None]
+        masks = np.where(in_suit, 1 << (flush_cards >> 2), 0).sum(axis=1)
+        strengths[flush_rows] = _FLUSH_ARR[masks]
+    return strengths
+
+
+def strength_category(strength):
+    """
+    Catégorie (1-9) d'une force renvoyée par evaluate.
+    """
+    return strength >> 20
+
 
 def hand_rank( hand, board):
         """
         Retourne la meilleure combinaison possible avec hand + board en lui attribuant une valeur numérique (1-9)
+        Enveloppe de compatibilité autour de evaluate (cartes au format ('H', 'A') ou entiers 0-51).
+        Lève ValueError au-delà de 7 cartes.
         """
-        value_list = ["2", "3", "4", "5", "6", "7", "8", "9", "T", "J", "Q", "K", "A"]
-
         cards = hand + board
         if len(cards) < 5: # Comme la fonction est utilisée à la fin
             return (1, cards)
 
-        value_map = {v: i+2 for i, v in enumerate(value_list)}
-        suits = [card[0] for card in cards]
-        values = [card[1] for card in cards]
-        num_values = [value_map[v] for v in values]
-        num_values.sort(reverse=True)
-
-        value_counts = Counter(values)
-        suit_counts = Counter(suits)
-
-        # Straight Flush (9)
-        if max(suit_counts.values()) >= 5:
-            for suit in suit_counts:
-                if suit_counts[suit] >= 5:
-                    suit_num_values = sorted([value_map[card[1]] for card in cards if card[0] == suit], reverse=True)
-                    for i in range(len(suit_num_values) - 4):
-                        if suit_num_values[i] - suit_num_values[i + 4] == 4 and len(set(suit_num_values[i:i+5])) == 5:
-                            high_card = value_list[suit_num_values[i] - 2]
-                            return (9, f"Straight Flush, {high_card} high")
-                    if set([14, 5, 4, 3, 2]).issubset(set(suit_num_values)):
-                        return (9, "Wheel Straight Flush (A-5)")
-
-        # Four of a kind (8)
-        for value, count in value_counts.items():
-            if count == 4:
-                return (8, f"Four of a kind {value}")
-
-        # Full House (7)
-        if 3 in value_counts.values() and 2 in value_counts.values():
-            return (7, "Full House")
-
-        # Flush (6)
-        if max(suit_counts.values()) >= 5:
-            return (6, "Flush")
-
-        # Straight (5)
-        unique_values = sorted(set(num_values), reverse=True)
-        for i in range(len(unique_values) - 4):
-            if unique_values[i] - unique_values[i + 4] == 4 and len(set(unique_values[i:i+5])) == 5:
-                return (5, "Straight")
-        if set([14, 5, 4, 3, 2]).issubset(set(num_values)):
-            return (5, "Wheel Straight (A-5)")
+        strength = evaluate(to_ints(cards))
+        category = strength_category(strength)
+        high_card = VALUES[(strength >> 16) & 0xF]
 
-        # Three of a kind (4)
-        if 3 in value_counts.values():
-            return (4, "Three of a kind")
-
-        # Two Pair (3)
-        if len([k for k, v in value_counts.items() if v == 2]) >= 2:
-            return (3, "Two pair")
-
-        # One Pair (2)
-        if 2 in value_counts.values():
-            return (2, "One pair")
+        if category == STRAIGHT_FLUSH:
+            if high_card == "5":
+                return (9, "Wheel Straight Flush (A-5)")
+            return (9, f"Straight Flush, {high_card} high")
+        if category == FOUR_OF_A_KIND:
+            return (8, f"Four of a kind {high_card}")
+        if category == STRAIGHT and high_card == "5":
+            return (5, "Wheel Straight (A-5)")
 
-        # High card (1)
-        return (1, "High card")
\ No newline at end of file
+        descriptions = {
+            FULL_HOUSE: "Full House",
+            FLUSH: "Flush",
+            STRAIGHT: "Straight",
+            THREE_OF_A_KIND: "Three of a kind",
+            TWO_PAIR: "Two pair",
+            ONE_PAIR: "One pair",
+            HIGH_CARD: "High card",
+        }
+        return (category, descriptions[category])